@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""Time appending peers with `File.add_section` at a few file sizes.
+
+The time per append should stay flat as the file grows.
+"""
+
+from argparse import ArgumentParser
+
+from common import best_of
+
+from wgconf.file import File
+from wgconf.line import SectionHead
+from wgconf.section import Section
+
+
+def make_peer(index):
+    section = Section(SectionHead("Peer"))
+    section.set_meta("Name", f"peer-{index}")
+    section["PublicKey"] = f"key-{index}="
+    return section
+
+
+def add_peers(n):
+    file = File()
+    for index in range(n):
+        file.add_section(make_peer(index))
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-p", "--peers", type=int, nargs="+", default=[10_000, 100_000]
+    )
+    args = parser.parse_args()
+
+    for peers in args.peers:
+        elapsed = best_of(lambda: add_peers(peers))
+        print(
+            f"{peers:>8} peers {elapsed:8.3f}s"
+            + f"  ({elapsed / peers * 1e6:.2f}us each)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Shared bits for the benchmark scripts in this directory.
+
+Run the scripts from the repo root, e.g. `python dev/bench/parse.py`.
+"""
+
+from base64 import b64encode
+from pathlib import Path
+import sys
+import time
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def fake_key(index: int) -> str:
+    return b64encode(index.to_bytes(32, "little")).decode("ascii")
+
+
+def config_text(peers: int) -> str:
+    """A server config with `peers` client [Peer] sections."""
+    lines = [
+        "[Interface]",
+        "# Name = wg0",
+        "Address = 10.0.0.1/32",
+        f"PrivateKey = {fake_key(0)}",
+        "ListenPort = 51820",
+        "",
+    ]
+    for index in range(1, peers + 1):
+        lines.extend(
+            (
+                "[Peer]",
+                f"# Name = peer-{index}",
+                f"AllowedIPs = 10.{index >> 16 & 255}.{index >> 8 & 255}."
+                + f"{index & 255}/32",
+                f"PublicKey = {fake_key(index)}",
+                f"PresharedKey = {fake_key(index + peers)}",
+                "",
+            )
+        )
+    return "".join(f"{line}\n" for line in lines)
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    """Best wall-clock time of `repeat` calls to `fn`, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
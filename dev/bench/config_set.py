@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""Time loading a directory of interfaces one by one vs with ConfigSet."""
+
+from argparse import ArgumentParser
+from pathlib import Path
+import tempfile
+
+from common import best_of, config_text
+
+from wgconf.config import Config
+from wgconf.config_set import ConfigSet
+
+HOSTNAME = "bench.example.com"
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-i", "--interfaces", type=int, default=16)
+    parser.add_argument("-p", "--peers", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        text = config_text(args.peers)
+        names = [f"wg{index}" for index in range(args.interfaces)]
+        for name in names:
+            (Path(tmp_dir) / f"{name}.conf").write_text(text)
+        print(f"{args.interfaces} interfaces x {args.peers} peers")
+
+        serial = best_of(
+            lambda: [
+                Config(hostname=HOSTNAME, name=name, dir=tmp_dir)
+                for name in names
+            ],
+            3,
+        )
+        threads = best_of(lambda: ConfigSet.load_dir(HOSTNAME, tmp_dir), 3)
+        processes = best_of(
+            lambda: ConfigSet.load_dir(HOSTNAME, tmp_dir, processes=True), 3
+        )
+
+    print(f"serial    {serial:8.3f}s")
+    print(f"threads   {threads:8.3f}s  ({serial / threads:.1f}x)")
+    print(f"processes {processes:8.3f}s  ({serial / processes:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""Time opening a large config and changing one peer, eager vs lazy."""
+
+from argparse import ArgumentParser
+from pathlib import Path
+import tempfile
+
+from common import best_of, config_text
+
+from wgconf.config import Config
+
+
+def touch_one(dir, lazy):
+    config = Config(hostname="bench.example.com", dir=dir, lazy=lazy)
+    config.peer("peer-4242").allowed_ips = "10.99.0.1/32"
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--peers", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        (Path(tmp_dir) / "wg0.conf").write_text(config_text(args.peers))
+        print(f"{args.peers} peers")
+
+        eager = best_of(lambda: touch_one(tmp_dir, False))
+        lazy = best_of(lambda: touch_one(tmp_dir, True))
+
+    print(f"eager {eager:8.3f}s")
+    print(f"lazy  {lazy:8.3f}s  ({eager / lazy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
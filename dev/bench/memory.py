@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""Measure the memory a parsed config takes, per [Peer] section.
+
+Counts every allocation made by `File.from_string` (strings included) with
+`tracemalloc`, so the numbers depend on the interpreter.
+"""
+
+from argparse import ArgumentParser
+import tracemalloc
+
+from common import config_text
+
+from wgconf.file import File
+
+
+def bytes_used(text):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        file = File.from_string(text)
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert not file.is_empty
+    return used
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--peers", type=int, default=10_000)
+    args = parser.parse_args()
+
+    used = bytes_used(config_text(args.peers))
+    print(f"{args.peers} peers")
+    print(f"{used / 2**20:8.1f} MiB  ({used / args.peers:.0f} bytes per peer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""Time tokenizing a large config: per-class matching vs `parse_line`."""
+
+from argparse import ArgumentParser
+
+from common import best_of, config_text
+
+from wgconf.util import find_map
+from wgconf.line import Blank, Comment, Option, SectionHead, parse_line
+
+
+def per_class(strings):
+    for string in strings:
+        # pylint: disable=cell-var-from-loop
+        find_map(
+            (Blank, Comment, SectionHead, Option),
+            lambda c: c.from_string(string),
+        )
+
+
+def combined(strings):
+    for string in strings:
+        parse_line(string)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--peers", type=int, default=50_000)
+    args = parser.parse_args()
+
+    strings = config_text(args.peers).splitlines()
+    print(f"{args.peers} peers, {len(strings)} lines")
+
+    before = best_of(lambda: per_class(strings))
+    after = best_of(lambda: combined(strings))
+
+    print(f"per-class  {before:8.3f}s")
+    print(f"parse_line {after:8.3f}s  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
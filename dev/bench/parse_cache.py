@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""Time loading a large config with and without a warm parse cache."""
+
+from argparse import ArgumentParser
+from pathlib import Path
+import tempfile
+
+from common import best_of, config_text
+
+from wgconf.file import File
+from wgconf.parse_cache import ParseCache
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--peers", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "wg0.conf"
+        path.write_text(config_text(args.peers))
+        cache = ParseCache(Path(tmp_dir) / "cache")
+        File(path, parse_cache=cache)  # Warm it up
+        print(f"{args.peers} peers")
+
+        parsed = best_of(lambda: File(path))
+        cached = best_of(lambda: File(path, parse_cache=cache))
+
+    print(f"parsed {parsed:8.3f}s")
+    print(f"cached {cached:8.3f}s  ({parsed / cached:.1f}x)")
+    print(cache.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+from unittest import TestCase, main
+
+from wgconf.config import Config
+from wgconf.keys import PythonKeyBackend
+
+from test_helpers import *
+
+class CountingKeyBackend(PythonKeyBackend):
+    def __init__(self):
+        self.calls = []
+
+    def genkey(self):
+        self.calls.append('genkey')
+        return super().genkey()
+
+    def pubkey(self, private_key):
+        self.calls.append('pubkey')
+        return super().pubkey(private_key)
+
+    def genpsk(self):
+        self.calls.append('genpsk')
+        return super().genpsk()
+
+    def genkeys(self, n, preshared_keys=True):
+        self.calls.append(('genkeys', n))
+        return super().genkeys(n, preshared_keys)
+
+class VersionKeyBackend(PythonKeyBackend):
+    """Records the file version at each generation."""
+
+    def __init__(self):
+        self.config = None
+        self.versions = []
+
+    def genkey(self):
+        self.versions.append(self.config.file.version)
+        return super().genkey()
+
+    def genpsk(self):
+        self.versions.append(self.config.file.version)
+        return super().genpsk()
+
+    def genkeys(self, n, preshared_keys=True):
+        self.versions.append(self.config.file.version)
+        return super().genkeys(n, preshared_keys)
+
+class TestBulkKeys(TestCase):
+    def setUp(self):
+        self.keys = CountingKeyBackend()
+        self.config = Config(hostname='testy.example.com', keys=self.keys)
+        self.config.create_interface(address='10.10.0.1')
+        self.keys.calls.clear()
+
+    def test_genkeys(self):
+        key_sets = PythonKeyBackend().genkeys(3)
+        self.assertEqual(len(key_sets), 3)
+        for key_set in key_sets:
+            self.assertEqual(
+                PythonKeyBackend().pubkey(key_set.private_key),
+                key_set.public_key,
+            )
+            self.assertIsNotNone(key_set.preshared_key)
+        self.assertIsNone(
+            PythonKeyBackend().genkeys(1, preshared_keys=False)[0].preshared_key
+        )
+
+    def test_update_clients_generates_in_one_pass(self):
+        updates = {
+            f"client-{i}": dict(private_address=f"10.10.0.{i + 2}")
+            for i in range(5)
+        }
+        configs = self.config.update_clients(updates)
+
+        self.assertEqual(len(configs), 5)
+        # One server public key derivation, shared by every client config
+        self.assertEqual(self.keys.calls, [('genkeys', 5), 'pubkey'])
+        self.keys.calls.clear()
+
+        for name, client in configs.items():
+            peer = self.config.peer(name)
+            self.assertEqual(
+                self.keys.pubkey(client.interface.private_key),
+                peer.public_key,
+            )
+            self.assertEqual(peer.preshared_key, client.peer().preshared_key)
+
+    def test_modify_only_generates_for_changes(self):
+        self.config.update_clients({
+            'a': dict(private_address='10.10.0.2'),
+            'b': dict(private_address='10.10.0.3'),
+        })
+        self.keys.calls.clear()
+
+        configs = self.config.update_clients({
+            'a': dict(private_address='10.10.0.2'),
+            'b': dict(private_address='10.10.0.4'),
+        })
+
+        self.assertEqual(list(configs.keys()), ['b'])
+        self.assertEqual(self.keys.calls, [('genkeys', 1)])
+        self.assertEqual(self.config.peer('b').allowed_ips, ['10.10.0.4/32'])
+
+    def test_psks_generated_before_changes(self):
+        self.config.update_clients({
+            'a': dict(private_address='10.10.0.2', preshared_key=False),
+        })
+        private_key = self.keys.genkey()
+        keys = VersionKeyBackend()
+        keys.config = self.config
+        self.config.keys = keys
+        for kwds in (
+            dict(clients={
+                'b': dict(private_address='10.10.0.3'),
+                'a': dict(private_key=private_key, preshared_key=True),
+            }),
+            dict(peers={
+                'c': dict(
+                    public_key=self.keys.pubkey(self.keys.genkey()),
+                    allowed_ips='10.20.0.1/32',
+                ),
+                'd': dict(
+                    public_key=self.keys.pubkey(self.keys.genkey()),
+                    allowed_ips='10.20.0.2/32',
+                    preshared_key=True,
+                ),
+            }),
+        ):
+            with self.subTest(kwds=kwds):
+                version = self.config.file.version
+                keys.versions.clear()
+                self.config.update(**kwds)
+                self.assertTrue(keys.versions)
+                self.assertEqual(set(keys.versions), {version})
+        self.assertIsNotNone(self.config.peer('a').preshared_key)
+        self.assertIsNotNone(self.config.peer('d').preshared_key)
+
+    def test_public_key_follows_private_key(self):
+        public_key = self.config.public_key
+        self.assertEqual(public_key, self.config.public_key)
+        self.assertEqual(self.keys.calls, ['pubkey'])
+
+        private_key = self.keys.genkey()
+        self.config.interface.private_key = private_key
+        self.assertEqual(self.config.public_key, self.keys.pubkey(private_key))
+        self.assertNotEqual(self.config.public_key, public_key)
+
+    def test_pubkey_memo(self):
+        private_key = self.config.interface.private_key
+        self.config.pubkey(private_key)
+        self.config.pubkey(private_key)
+        self.assertEqual(self.keys.calls, ['pubkey'])
+        self.assertNotIn('pubkey', vars(self.config))
+
+        keys = CountingKeyBackend()
+        self.config.keys = keys
+        self.config.pubkey(private_key)
+        self.assertEqual(keys.calls, ['pubkey'])
+
+    def test_pubkey_memo_is_bounded(self):
+        self.config.PUBKEY_CACHE_SIZE = 2
+        private_keys = [self.keys.genkey() for _ in range(3)]
+        for private_key in private_keys:
+            self.config.pubkey(private_key)
+        self.keys.calls.clear()
+        self.config.pubkey(private_keys[2])
+        self.assertEqual(self.keys.calls, [])
+        self.config.pubkey(private_keys[0])
+        self.assertEqual(self.keys.calls, ['pubkey'])
+
+if __name__ == '__main__':
+    main()
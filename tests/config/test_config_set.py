@@ -0,0 +1,90 @@
+from unittest import TestCase, main
+from pathlib import Path
+import tempfile
+
+from wgconf.config import Config
+from wgconf.config_set import ConfigSet
+
+from test_helpers import *
+
+HOSTNAME = 'testy.example.com'
+
+class TestConfigSet(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.public_keys = {}
+        for index, clients in enumerate((('a', 'b'), ('c',), ('a',))):
+            config = Config(hostname=HOSTNAME, name=f"wg{index}", dir=self.dir)
+            config.create_interface(address=f"10.{index}.0.1/32")
+            config.update_clients({
+                name: dict(private_address=f"10.{index}.0.{offset + 2}")
+                for offset, name in enumerate(clients)
+            })
+            for peer in config.peers():
+                self.public_keys[(config.name, peer.name)] = peer.public_key
+            config.write()
+        (self.dir / 'notes.txt').write_text('not a config\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check(self, config_set):
+        self.assertEqual(
+            [config.name for config in config_set], ['wg0', 'wg1', 'wg2']
+        )
+        for config in config_set:
+            self.assertEqual(
+                str(config),
+                str(Config(hostname=HOSTNAME, name=config.name, dir=self.dir)),
+            )
+            self.assertEqual(config.path, self.dir / f"{config.name}.conf")
+
+        self.assertEqual(
+            [config.name for config in config_set.configs_with_client('a')],
+            ['wg0', 'wg2'],
+        )
+        self.assertEqual(config_set.configs_with_client('nobody'), [])
+
+        owner = config_set.owner_of_public_key(self.public_keys[('wg1', 'c')])
+        self.assertIs(owner, config_set['wg1'])
+        self.assertIsNone(config_set.owner_of_public_key('nope='))
+
+    def test_load_dir_threads(self):
+        self.check(ConfigSet.load_dir(HOSTNAME, self.dir, workers=2))
+
+    def test_load_dir_processes(self):
+        self.check(ConfigSet.load_dir(
+            HOSTNAME, self.dir, workers=2, processes=True
+        ))
+
+    def test_indexes_follow_changes(self):
+        config_set = ConfigSet.load_dir(HOSTNAME, self.dir)
+        self.assertEqual(config_set.configs_with_client('d'), [])
+        config_set['wg1'].update_clients({
+            'd': dict(private_address='10.1.0.9'),
+        })
+        self.assertEqual(
+            config_set.configs_with_client('d'), [config_set['wg1']]
+        )
+
+        # Straight through the peer, not the Config
+        public_key = self.public_keys[('wg0', 'b')]
+        self.assertIs(
+            config_set.owner_of_public_key(public_key), config_set['wg0']
+        )
+        config_set['wg0'].peer('b').public_key = self.public_keys[('wg1', 'c')]
+        config_set['wg1'].peer('c').public_key = public_key
+        self.assertIs(
+            config_set.owner_of_public_key(public_key), config_set['wg1']
+        )
+
+        del config_set.configs['wg1']
+        self.assertIsNone(config_set.owner_of_public_key(public_key))
+
+    def test_lazy_needs_threads(self):
+        with self.assertRaises(ValueError):
+            ConfigSet.load_dir(HOSTNAME, self.dir, processes=True, lazy=True)
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,15 @@
 from unittest import TestCase, main
 
-from wgconf.util import join_lines, first, pubkey
+from wgconf.util import join_lines, first
 from wgconf.config import Config
 
 from test_helpers import *
 
-wg_bin_path = '/usr/local/bin/wg'
-
 class TestCreateConfig(TestCase):
     def test_defaults(self):
         hostname = 'testy.example.com'
         
-        server_config = Config(hostname=hostname, wg_bin_path=wg_bin_path)
+        server_config = Config(hostname=hostname)
         server_config.create_interface()
         client_config = server_config.add_client(
             name='urmom',
@@ -19,10 +17,10 @@ class TestCreateConfig(TestCase):
         )
         
         server_private_key = server_config.interface.private_key
-        server_public_key = pubkey(server_private_key, wg_bin_path)
+        server_public_key = server_config.keys.pubkey(server_private_key)
         
         client_private_key = client_config.interface.private_key
-        client_public_key = pubkey(client_private_key, wg_bin_path)
+        client_public_key = server_config.keys.pubkey(client_private_key)
         
         preshared_key = server_config.peer('urmom').preshared_key
         
@@ -0,0 +1,106 @@
+from unittest import TestCase, main
+from pathlib import Path
+import stat
+import tempfile
+
+from wgconf.config import Config
+from wgconf.keys import KeySet, PythonKeyBackend
+from wgconf.keystore import MemoryKeyStore, SQLiteKeyStore
+
+from test_helpers import *
+
+class TestSQLiteKeyStore(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'keys.sqlite'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        key_set = KeySet('priv', 'pub', None)
+        with SQLiteKeyStore(self.path) as store:
+            store.put('a', key_set)
+            self.assertEqual(store.get('a'), key_set)
+            self.assertIsNone(store.get('b'))
+
+        self.assertEqual(stat.S_IMODE(self.path.stat().st_mode), 0o600)
+
+        with SQLiteKeyStore(self.path) as store:
+            self.assertEqual(store.get('a'), key_set)
+            store.delete('a')
+            self.assertIsNone(store.get('a'))
+
+    def test_scope(self):
+        with SQLiteKeyStore(self.path, scope='wg0') as wg0:
+            wg0.put('a', KeySet('priv', 'pub', 'psk'))
+            with SQLiteKeyStore(self.path, scope='wg1') as wg1:
+                self.assertIsNone(wg1.get('a'))
+
+    def test_batch_rolls_back(self):
+        with SQLiteKeyStore(self.path) as store:
+            with self.assertRaises(RuntimeError):
+                with store.batch():
+                    store.put('a', KeySet('priv', 'pub', 'psk'))
+                    raise RuntimeError("boom")
+            self.assertIsNone(store.get('a'))
+
+class TestConfigKeyStore(TestCase):
+    def setUp(self):
+        self.keystore = MemoryKeyStore()
+        self.config = Config(hostname='testy.example.com', keystore=self.keystore)
+        self.config.create_interface()
+
+    def test_modify_reuses_stored_keys(self):
+        added = self.config.update_clients({
+            'a': dict(private_address='10.10.0.2'),
+        })
+        public_key = self.config.peer('a').public_key
+        self.assertEqual(
+            self.keystore.get('a').private_key,
+            added['a'].interface.private_key,
+        )
+
+        modified = self.config.update_clients({
+            'a': dict(private_address='10.10.0.3'),
+        })
+
+        self.assertEqual(self.config.peer('a').public_key, public_key)
+        self.assertEqual(
+            modified['a'].interface.private_key,
+            added['a'].interface.private_key,
+        )
+        self.assertEqual(
+            modified['a'].peer().preshared_key,
+            added['a'].peer().preshared_key,
+        )
+
+        self.assertEqual(
+            self.config.update_clients({'a': dict(private_address='10.10.0.3')}),
+            {},
+        )
+        self.assertEqual(
+            str(self.config.client_config('a')),
+            str(modified['a']),
+        )
+
+    def test_add_reuses_stored_keys(self):
+        key_set = PythonKeyBackend().genkeys(1)[0]
+        self.keystore.put('a', key_set)
+
+        client = self.config.add_client(name='a', private_address='10.10.0.2')
+
+        self.assertEqual(client.interface.private_key, key_set.private_key)
+        self.assertEqual(self.config.peer('a').public_key, key_set.public_key)
+        self.assertEqual(
+            self.config.peer('a').preshared_key,
+            key_set.preshared_key,
+        )
+
+    def test_remove_deletes_stored_keys(self):
+        self.config.update_clients({'a': dict(private_address='10.10.0.2')})
+        self.config.update_clients({'a': None})
+        self.assertIsNone(self.keystore.get('a'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+from unittest import TestCase, main
+
+from wgconf.config import Config
+from wgconf.keys import PythonKeyBackend, derive_key_set
+
+from test_helpers import *
+
+MASTER_SECRET = 'x' * 32
+
+class NoGenBackend(PythonKeyBackend):
+    def genkey(self):
+        raise AssertionError("Should not generate a key")
+
+    def genpsk(self):
+        raise AssertionError("Should not generate a key")
+
+    def genkeys(self, n, preshared_keys=True):
+        raise AssertionError("Should not generate keys")
+
+class TestMasterSecret(TestCase):
+    def config(self):
+        config = Config(
+            hostname='testy.example.com',
+            master_secret=MASTER_SECRET,
+        )
+        config.create_interface()
+        config.keys = NoGenBackend()
+        return config
+
+    def test_derive_key_set(self):
+        key_set = derive_key_set(MASTER_SECRET, 'a')
+        self.assertEqual(key_set, derive_key_set(MASTER_SECRET.encode(), 'a'))
+        self.assertNotEqual(key_set, derive_key_set(MASTER_SECRET, 'b'))
+        self.assertEqual(
+            PythonKeyBackend().pubkey(key_set.private_key),
+            key_set.public_key,
+        )
+        self.assertRaises(ValueError, derive_key_set, 'too short', 'a')
+
+    def test_same_keys_across_configs(self):
+        clients_1 = self.config().update_clients({
+            'a': dict(private_address='10.10.0.2'),
+        })
+        clients_2 = self.config().update_clients({
+            'a': dict(private_address='10.10.0.2'),
+        })
+        self.assertEqual(
+            clients_1['a'].interface.private_key,
+            clients_2['a'].interface.private_key,
+        )
+        self.assertEqual(
+            clients_1['a'].peer().preshared_key,
+            clients_2['a'].peer().preshared_key,
+        )
+
+    def test_modify_does_not_rekey(self):
+        config = self.config()
+        config.update_clients({'a': dict(private_address='10.10.0.2')})
+        public_key = config.peer('a').public_key
+
+        clients = config.update_clients({'a': dict(private_address='10.10.0.3')})
+
+        self.assertEqual(config.peer('a').public_key, public_key)
+        self.assertEqual(config.peer('a').allowed_ips, ['10.10.0.3/32'])
+        self.assertEqual(
+            clients['a'].interface.private_key,
+            derive_key_set(MASTER_SECRET, 'a').private_key,
+        )
+
+    def test_client_config(self):
+        config = self.config()
+        added = config.add_client(name='a', private_address='10.10.0.2')
+        config.add_peer(
+            name='other',
+            allowed_ips='10.10.0.9/32',
+            public_key=PythonKeyBackend().pubkey(PythonKeyBackend().genkey()),
+        )
+
+        self.assertEqual(str(config.client_config('a')), str(added))
+        self.assertIsNone(config.client_config('other'))
+        self.assertRaises(KeyError, config.client_config, 'nope')
+
+if __name__ == '__main__':
+    main()
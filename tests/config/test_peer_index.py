@@ -0,0 +1,107 @@
+from unittest import TestCase, main
+
+from wgconf.config import Config
+from wgconf.keys import PythonKeyBackend
+from wgconf.peer import Peer
+
+from test_helpers import *
+
+def names(config):
+    return [peer.name for peer in config.peers()]
+
+class TestPeerIndex(TestCase):
+    def setUp(self):
+        self.config = Config(
+            hostname='testy.example.com',
+            name='wg0',
+            dir=None,
+            keys=PythonKeyBackend(),
+        )
+        self.config.create_interface(address='10.10.0.1')
+        self.config.update_clients({
+            'one': dict(private_address='10.10.0.2'),
+            'two': dict(private_address='10.10.0.3'),
+        })
+
+    def test_lookups(self):
+        one = self.config.peer('one')
+        self.assertEqual(one.name, 'one')
+        self.assertIsNone(self.config.peer('nope'))
+        self.assertEqual(
+            self.config.peer_with_public_key(one.public_key).name, 'one'
+        )
+        self.assertEqual(
+            self.config.peer_with_address('10.10.0.3').name, 'two'
+        )
+        self.assertIsNone(self.config.peer_with_address('10.10.0.4'))
+
+    def test_kept_up_to_date(self):
+        old_key = self.config.peer('two').public_key
+        self.config.peer_with_address('10.10.0.2')  # Build them all
+
+        self.config.update_clients({
+            'one': None,
+            'two': dict(private_address='10.10.0.4'),
+            'three': dict(private_address='10.10.0.2'),
+        })
+
+        self.assertIsNone(self.config.peer('one'))
+        self.assertEqual(
+            self.config.peer_with_address('10.10.0.2').name, 'three'
+        )
+        self.assertEqual(
+            self.config.peer_with_address('10.10.0.4').name, 'two'
+        )
+        self.assertIsNone(self.config.peer_with_address('10.10.0.3'))
+        # Moving it re-keyed it
+        self.assertIsNone(self.config.peer_with_public_key(old_key))
+        two = self.config.peer('two')
+        self.assertEqual(
+            self.config.peer_with_public_key(two.public_key).name, 'two'
+        )
+
+    def test_changed_behind_our_back(self):
+        self.config.peer('one').remove()
+        self.assertIsNone(self.config.peer('one'))
+
+        self.config.peer('two').name = 'deux'
+        self.assertIsNone(self.config.peer('two'))
+        self.assertEqual(
+            self.config.peer('deux').allowed_ips, ['10.10.0.3/32']
+        )
+
+    def test_renamed_then_updated(self):
+        self.config.peer('one').name = 'uno'
+        self.config.update_clients({'uno': dict(description='x')})
+        self.assertEqual(names(self.config), ['uno', 'two'])
+        self.assertEqual(self.config.peer('uno').description, 'x')
+
+    def test_added_then_updated(self):
+        self.config.peer('one')  # Build the index first
+        self.config.file.add_section(
+            Peer.create(name='b', public_key='Yg==', allowed_ips='10.10.0.9')
+        )
+        self.config.update_peers({'b': dict(description='x')})
+        self.assertEqual(names(self.config), ['one', 'two', 'b'])
+        self.assertEqual(self.config.peer('b').description, 'x')
+
+    def test_own_changes_keep_the_index(self):
+        self.config.peer('one')
+        index = self.config._peer_index('name')
+        self.config.update_clients({
+            'one': None,
+            'three': dict(private_address='10.10.0.4'),
+        })
+        self.config.update_peers({'two': dict(description='x')})
+        self.assertIs(self.config._peer_index('name'), index)
+
+    def test_one_peer_matched_twice(self):
+        key = self.config.peer('two').public_key
+        with self.assertRaisesRegex(Exception, 'matched for both'):
+            self.config.update_peers({
+                'two': dict(description='x'),
+                'deux': dict(public_key=key, allowed_ips='10.10.0.3/32'),
+            })
+
+if __name__ == '__main__':
+    main()
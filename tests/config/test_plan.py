@@ -0,0 +1,184 @@
+from unittest import TestCase, main
+
+from wgconf.config import Config
+from wgconf.keys import PythonKeyBackend
+
+from test_helpers import *
+
+class TestPlan(TestCase):
+    def setUp(self):
+        self.config = Config(
+            hostname='testy.example.com',
+            name='wg0',
+            dir=None,
+            keys=PythonKeyBackend(),
+        )
+        self.config.create_interface(address='10.10.0.1')
+        self.config.update_clients({
+            'one': dict(private_address='10.10.0.2'),
+            'two': dict(private_address='10.10.0.3'),
+        })
+
+    def test_dry_run(self):
+        before = str(self.config)
+        updates = {
+            'one': None,
+            'three': dict(private_address='10.10.0.4'),
+        }
+        plan = self.config.plan(clients=updates)
+
+        self.assertTrue(plan.changed)
+        self.assertEqual(
+            [(action.name, action.type) for action in plan.clients],
+            [('one', 'remove'), ('three', 'add')],
+        )
+        self.assertEqual(str(self.config), before)
+        self.assertEqual(updates['three'], dict(private_address='10.10.0.4'))
+
+        client_configs = self.config.apply(plan)
+        self.assertEqual(list(client_configs), ['three'])
+        self.assertIsNone(self.config.peer('one'))
+        self.assertEqual(
+            self.config.peer('three').allowed_ips, ['10.10.0.4/32']
+        )
+
+    def test_no_changes(self):
+        plan = self.config.plan(
+            interface=dict(address='10.10.0.1/32'),
+            clients={
+                'one': dict(private_address='10.10.0.2'),
+                'nope': None,
+            },
+        )
+        self.assertFalse(plan.changed)
+        self.assertTrue(
+            self.config.plan(interface=dict(listen_port=1234)).changed
+        )
+        self.assertTrue(
+            self.config.plan(
+                clients={'one': dict(private_address='10.10.0.9')}
+            ).changed
+        )
+
+    def test_conflicts(self):
+        before = str(self.config)
+        for kwds in (
+            dict(
+                peers={'one': dict(description='x')},
+                clients={'one': dict(description='y')},
+            ),
+            dict(clients={
+                'three': dict(private_address='10.10.0.4'),
+                'four': dict(private_address='10.10.0.4'),
+            }),
+            dict(clients={'three': dict(private_address='10.10.0.2')}),
+        ):
+            with self.subTest(kwds=kwds):
+                with self.assertRaises(ValueError):
+                    self.config.update(**kwds)
+                self.assertEqual(str(self.config), before)
+
+        # Freed up in the same batch
+        self.config.update_clients({
+            'one': None,
+            'three': dict(private_address='10.10.0.2'),
+        })
+        self.assertEqual(
+            self.config.peer_with_address('10.10.0.2').name, 'three'
+        )
+
+    def test_same_name_in_peers_and_clients(self):
+        before = str(self.config)
+        with self.assertRaisesRegex(ValueError, 'both peers and clients'):
+            self.config.update(
+                peers={'one': None, 'two': dict(description='x')},
+                clients={'two': dict(description='y'), 'three': None},
+            )
+        self.assertEqual(str(self.config), before)
+
+        # Either alone is fine
+        self.config.update(peers={'two': dict(description='x')})
+        self.config.update(clients={'two': dict(description='y')})
+        self.assertEqual(self.config.peer('two').description, 'y')
+
+    def test_bad_props_change_nothing(self):
+        before = str(self.config)
+        for kwds in (
+            dict(peers={
+                'a': dict(public_key='QUFBQQ==', allowed_ips='10.9.0.1/32'),
+                'b': dict(public_key='QkJCQg==', persistent_keepalive='x'),
+            }),
+            dict(peers={
+                'a': dict(public_key='QUFBQQ==', allowed_ips='10.9.0.1/32'),
+                'b': dict(allowed_ips='10.9.0.2/32'),  # No public key
+            }),
+            dict(peers={
+                'one': dict(description='x'),
+                'two': dict(persistent_keepalive='x'),
+            }),
+            dict(clients={
+                'three': dict(private_address='10.10.0.4'),
+                'four': dict(private_address='10.10.0.5', dns=5),
+            }),
+            dict(clients={
+                'one': dict(description='x'),
+                'two': dict(persistent_keepalive='x'),
+            }),
+        ):
+            with self.subTest(kwds=kwds):
+                with self.assertRaises(TypeError):
+                    self.config.update(**kwds)
+                self.assertEqual(str(self.config), before)
+
+    def test_mismatched_keys_change_nothing(self):
+        before = str(self.config)
+        keys = self.config.keys
+        private_key = keys.genkey()
+        other_public_key = keys.pubkey(keys.genkey())
+        for name in ('two', 'three'):  # A modify, then an add
+            with self.subTest(name=name):
+                with self.assertRaises(ValueError):
+                    self.config.update_clients({
+                        'one': None,
+                        name: dict(
+                            private_address='10.10.0.3',
+                            private_key=private_key,
+                            public_key=other_public_key,
+                        ),
+                    })
+                self.assertEqual(str(self.config), before)
+
+    def test_stale_plan(self):
+        add = self.config.plan(clients={
+            'three': dict(private_address='10.10.0.4'),
+        })
+        remove = self.config.plan(clients={'one': None})
+
+        self.config.apply(add)
+        for plan in (add, remove):
+            with self.subTest(plan=plan.clients[0].type):
+                with self.assertRaisesRegex(ValueError, 'out of date'):
+                    self.config.apply(plan)
+        self.assertEqual(
+            [peer.name for peer in self.config.peers()],
+            ['one', 'two', 'three'],
+        )
+
+        # Changed some other way
+        plan = self.config.plan(clients={'one': None})
+        self.config.peer('two').description = 'x'
+        with self.assertRaisesRegex(ValueError, 'out of date'):
+            self.config.apply(plan)
+
+    def test_no_interface(self):
+        config = Config(hostname='other', name='wg1', dir=None)
+        with self.assertRaisesRegex(ValueError, 'No Interface'):
+            config.plan(clients={'one': dict(private_address='10.10.0.2')})
+
+    def test_other_config(self):
+        other = Config(hostname='other', name='wg1', dir=None)
+        with self.assertRaises(ValueError):
+            other.apply(self.config.plan(peers={}))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+from unittest import TestCase, main
+import tempfile
+
+from wgconf.config import Config
+from wgconf.keys import PythonKeyBackend
+
+from test_helpers import *
+
+class NoPubkeyBackend(PythonKeyBackend):
+    def pubkey(self, private_key):
+        raise AssertionError("Should not derive a public key")
+
+class TestStorePublicKey(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.keys = PythonKeyBackend()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def create(self):
+        config = Config(
+            hostname='testy.example.com',
+            dir=self.tmp_dir.name,
+            store_public_key=True,
+        )
+        config.create_interface()
+        config.write()
+        return config
+
+    def test_stored_as_meta(self):
+        config = self.create()
+        public_key = self.keys.pubkey(config.interface.private_key)
+
+        self.assertEqual(str(config), unblock(f"""
+            [Interface]
+            # Name = wg0
+            # PublicKey = {public_key}
+            Address = 10.10.0.1/32
+            PrivateKey = {config.interface.private_key}
+
+        """))
+
+    def test_trusted_on_load(self):
+        public_key = self.create().public_key
+
+        config = Config(
+            hostname='testy.example.com',
+            dir=self.tmp_dir.name,
+            keys=NoPubkeyBackend(),
+            store_public_key=True,
+        )
+        self.assertEqual(config.public_key, public_key)
+
+        clients = config.update_clients({'a': dict(private_address='10.10.0.2')})
+        self.assertEqual(clients['a'].peer().public_key, public_key)
+
+    def test_follows_private_key(self):
+        self.create()
+
+        config = Config(
+            hostname='testy.example.com',
+            dir=self.tmp_dir.name,
+            store_public_key=True,
+        )
+        private_key = self.keys.genkey()
+        config.update_interface(private_key=private_key)
+
+        self.assertEqual(config.interface.public_key, self.keys.pubkey(private_key))
+        self.assertEqual(config.public_key, self.keys.pubkey(private_key))
+
+    def test_check_public_key(self):
+        tampered = self.create()
+        public_key = tampered.public_key
+        tampered.interface.public_key = self.keys.pubkey(self.keys.genkey())
+        tampered.write()
+
+        config = Config(
+            hostname='testy.example.com',
+            dir=self.tmp_dir.name,
+            store_public_key=True,
+        )
+        self.assertNotEqual(config.public_key, public_key)
+        self.assertFalse(config.check_public_key())
+        self.assertEqual(config.public_key, public_key)
+        self.assertEqual(config.interface.public_key, public_key)
+        self.assertTrue(config.check_public_key())
+
+if __name__ == '__main__':
+    main()
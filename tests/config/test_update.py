@@ -1,12 +1,10 @@
 from unittest import TestCase, main
 
-from wgconf.util import join_lines, first, pubkey
+from wgconf.util import join_lines, first
 from wgconf.config import Config
 
 from test_helpers import *
 
-wg_bin_path = '/usr/local/bin/wg'
-
 class TestUpdateConfig(TestCase):
     def test_update_clients(self):
         self.maxDiff = None
@@ -16,7 +14,6 @@ class TestUpdateConfig(TestCase):
         config = Config(
             hostname=hostname,
             name='wg83',
-            wg_bin_path=wg_bin_path,
         )
         
         config.update_interface(
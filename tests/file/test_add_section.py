@@ -0,0 +1,109 @@
+from unittest import TestCase, main
+
+from wgconf.file import File
+from wgconf.line import Blank, Comment, Line, SectionHead
+from wgconf.section import Section
+
+from test_helpers import *
+
+def make_peer(index):
+    section = Section(SectionHead('Peer'))
+    section.set_meta('Name', f"peer-{index}")
+    section['PublicKey'] = f"key-{index}="
+    return section
+
+def add_peers(file, n):
+    for index in range(n):
+        file.add_section(make_peer(index))
+
+class CountingComment(Comment):
+    """Counts reads of its `next`."""
+
+    __slots__ = ()
+
+    reads = 0
+
+    @property
+    def next(self):
+        CountingComment.reads += 1
+        return Line.next.__get__(self)
+
+    @next.setter
+    def next(self, line):
+        Line.next.__set__(self, line)
+
+def counting_peer(index):
+    section = make_peer(index)
+    section.head.insert_next(CountingComment('counted'))
+    return section
+
+def count_reads(fn):
+    CountingComment.reads = 0
+    fn()
+    return CountingComment.reads
+
+def walked_last_line(file):
+    line = None
+    for line in file.lines():
+        pass
+    return line
+
+class TestAddSection(TestCase):
+    def test_last_line_follows_changes(self):
+        file = File.from_string('# Top\n')
+        self.assertIs(file.last_line, walked_last_line(file))
+
+        add_peers(file, 3)
+        self.assertIs(file.last_line, walked_last_line(file))
+
+        file.last_line.insert_next(Comment('trailing'))
+        self.assertEqual(file.last_line.value, 'trailing')
+
+        file.last_line.remove()
+        self.assertIsInstance(file.last_line, Blank)
+        self.assertIs(file.last_line, walked_last_line(file))
+
+        list(file.sections('Peer'))[-1].remove()
+        self.assertIs(file.last_line, walked_last_line(file))
+        self.assertEqual(len(list(file.sections('Peer'))), 2)
+
+        list(file.sections('Peer'))[-1].replace(make_peer(9))
+        self.assertIs(file.last_line, walked_last_line(file))
+
+        file.add_section(make_peer(10))
+        self.assertEqual(
+            str(file).split('\n\n')[-3:],
+            ['[Peer]\n# Name = peer-9\nPublicKey = key-9=',
+             '[Peer]\n# Name = peer-10\nPublicKey = key-10=',
+             ''],
+        )
+
+    def test_empty(self):
+        file = File()
+        self.assertIsNone(file.last_line)
+        file.add_section(make_peer(0))
+        self.assertEqual(str(file), '[Peer]\n# Name = peer-0\nPublicKey = key-0=\n\n')
+
+    def test_start_is_not_walked(self):
+        file = File()
+        file._default_section_head.insert_next(CountingComment('top'))
+        file.add_section(make_peer(0))
+
+        self.assertEqual(count_reads(lambda: add_peers(file, 100)), 0)
+
+    def test_appending_is_linear(self):
+        # Timings are in dev/bench/add_section.py; here, count the lines
+        # walked per append, which shouldn't grow with the file
+        def reads_per_append(size):
+            file = File()
+            for index in range(size):
+                file.add_section(counting_peer(index))
+            return count_reads(
+                lambda: file.add_section(counting_peer(size))
+            )
+
+        self.assertEqual(reads_per_append(1000), reads_per_append(10))
+        self.assertLessEqual(reads_per_append(10), 3)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+from unittest import TestCase, main
+from io import StringIO
+
+from wgconf.file import File
+
+from test_helpers import *
+
+FILE_PATH = DATA_DIR / 'file' / 'duplicate_options.conf'
+
+class TestFromStream(TestCase):
+    def setUp(self):
+        with open(FILE_PATH) as fp:
+            self.text = fp.read()
+
+    def test_from_fp(self):
+        file = File.from_fp(StringIO(self.text), dup='list')
+        self.assertEqual(str(file), str(File(FILE_PATH, dup='list')))
+        self.assertEqual(file['Service']['ExecStart'], ['one', 'two', 'three'])
+        self.assertIsNone(file.path)
+
+    def test_from_open_file(self):
+        with open(FILE_PATH) as fp:
+            file = File.from_fp(fp, dup='list')
+        self.assertEqual(str(file), str(File(FILE_PATH, dup='list')))
+
+    def test_from_stream_without_newlines(self):
+        file = File.from_stream(
+            (line for line in self.text.splitlines()),
+            path='/tmp/nowhere.conf',
+        )
+        self.assertEqual(str(file), str(File(FILE_PATH)))
+        self.assertEqual(str(file.path), '/tmp/nowhere.conf')
+
+    def test_crlf(self):
+        file = File.from_stream(['[Peer]\r\n', 'PublicKey = abc=\r\n'])
+        self.assertEqual(str(file), '[Peer]\nPublicKey = abc=\n')
+
+    def test_bad_line(self):
+        with self.assertRaisesRegex(Exception, r'<stream>:2 Bad line: nope'):
+            File.from_stream(['[Peer]\n', 'nope\n'])
+
+class TestFromString(TestCase):
+    def setUp(self):
+        with open(FILE_PATH) as fp:
+            self.text = fp.read()
+        self.expected = str(File(FILE_PATH, dup='list'))
+
+    def test_from_string(self):
+        file = File.from_string(self.text, dup='list')
+        self.assertEqual(str(file), self.expected)
+        self.assertEqual(file['Service']['ExecStart'], ['one', 'two', 'three'])
+
+    def test_from_bytes(self):
+        data = self.text.encode()
+        self.assertEqual(str(File.from_bytes(data, dup='list')), self.expected)
+        self.assertEqual(
+            str(File.from_bytes(bytearray(data), dup='list')), self.expected
+        )
+
+    def test_from_memoryview_slice(self):
+        data = b'junk\n' + self.text.encode() + b'more junk'
+        view = memoryview(data)[5:-9]
+        self.assertEqual(str(File.from_bytes(view, dup='list')), self.expected)
+
+    def test_no_trailing_newline(self):
+        file = File.from_string('[Peer]\r\nPublicKey = abc=')
+        self.assertEqual(str(file), '[Peer]\nPublicKey = abc=\n')
+        self.assertTrue(File.from_bytes(b'').is_empty)
+
+    def test_encoding(self):
+        data = '# Name = caf\u00e9\n'.encode('latin_1')
+        file = File.from_bytes(data, encoding='latin_1')
+        self.assertEqual(file.first_line.value, 'Name = caf\u00e9')
+
+    def test_bad_line(self):
+        with self.assertRaisesRegex(Exception, r'<bytes>:2 Bad line: nope'):
+            File.from_bytes(b'[Peer]\nnope\n')
+        with self.assertRaisesRegex(Exception, r'x.conf:1 Bad line: nope'):
+            File.from_string('nope', path='x.conf')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+from unittest import TestCase, main
+from pathlib import Path
+import tempfile
+
+from wgconf.config import Config
+from wgconf.file import File
+from wgconf.line import LazySectionHead
+from wgconf.peer import Peer
+
+from test_helpers import *
+
+TEXT = unblock('''
+    # Default section comment
+
+    [Interface]
+    # Name = wg0
+    Address = 10.10.0.1/32
+    PrivateKey = cHJpdmF0ZQ==
+
+    [Peer]
+    # Name = one
+    #Description=First
+    AllowedIPs=10.10.0.2/32
+    PublicKey = b25l
+
+    [Peer]
+    # Description = No name
+
+    AllowedIPs = 10.10.0.3/32
+    PublicKey = dHdv
+
+    [Peer]
+    #Name=three
+    # Name = shadowed
+    AllowedIPs = 10.10.0.4/32
+    PublicKey = dGhyZWU=
+''')
+
+def loaded(file):
+    return [
+        section.head.is_loaded
+        for section in file.sections()
+        if isinstance(section.head, LazySectionHead)
+    ]
+
+class TestLazyFile(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+        self.path = self.dir / 'wg0.conf'
+        self.path.write_text(TEXT)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_same_as_eager(self):
+        lazy = File(self.path, lazy=True)
+        self.assertEqual(loaded(lazy), [False] * 4)
+        self.assertEqual(str(lazy), str(File(self.path)))
+        self.assertEqual(loaded(lazy), [True] * 4)
+
+    def test_names_without_loading(self):
+        file = File(self.path, lazy=True)
+        self.assertEqual(
+            [section.name for section in file.sections()],
+            [None, 'wg0', 'one', None, 'three'],
+        )
+        self.assertEqual(loaded(file), [False] * 4)
+
+    def test_touch_one_peer(self):
+        config = Config(hostname='testy.example.com', dir=self.dir, lazy=True)
+        peer = config.peer('three')
+        self.assertEqual(loaded(config.file), [False] * 4)
+
+        peer.allowed_ips = '10.10.0.5/32'
+        self.assertEqual(loaded(config.file), [False, False, False, True])
+
+        eager = Config(hostname='testy.example.com', dir=self.dir)
+        eager.peer('three').allowed_ips = '10.10.0.5/32'
+        self.assertEqual(str(config), str(eager))
+
+    def test_remove_after_unloaded(self):
+        file = File(self.path, lazy=True)
+        eager = File(self.path)
+        for f in (file, eager):
+            sections = list(f.sections())
+            sections[3].remove()
+            sections[4].replace(
+                Peer.create(name='four', allowed_ips='10.10.0.9/32', public_key='x')
+            )
+        self.assertEqual(str(file), str(eager))
+
+    def test_bad_line_on_load(self):
+        self.path.write_text(TEXT + 'oops\n')
+        file = File(self.path, lazy=True)
+        self.assertEqual(file['Interface']['Address'], '10.10.0.1/32')
+        with self.assertRaises(Exception) as eager_error:
+            File(self.path)
+        with self.assertRaises(Exception) as lazy_error:
+            str(file)
+        self.assertEqual(str(lazy_error.exception), str(eager_error.exception))
+        self.assertRegex(str(lazy_error.exception), r'wg0.conf:26 Bad line')
+
+    def test_bad_line_loses_nothing(self):
+        self.path.write_text(
+            TEXT.replace('PublicKey = b25l\n', 'PublicKey = b25l\noops\n')
+        )
+        file = File(self.path, lazy=True)
+        for _ in range(2):
+            with self.assertRaisesRegex(Exception, 'Bad line: oops'):
+                str(file)
+        self.assertEqual(
+            [section.name for section in file.sections()],
+            [None, 'wg0', 'one', None, 'three'],
+        )
+        self.assertEqual(loaded(file), [True, False, False, False])
+        three = list(file.sections('Peer'))[-1]
+        self.assertEqual(three['PublicKey'], 'dGhyZWU=')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+from unittest import TestCase, main
+from pathlib import Path
+import tempfile
+
+from wgconf.file import File
+from wgconf.mapped_file import MappedFile
+
+from test_helpers import *
+
+TEXT = unblock('''
+    # PublicKey = not-a-peer
+
+    [Interface]
+    # Name = wg0
+    Address = 10.10.0.1/32
+    PrivateKey = cHJpdmF0ZQ==
+    ListenPort=51821   
+
+    [Peer]
+    # Name = one
+    AllowedIPs = 10.10.0.2/32
+    PublicKey = b25l
+
+    [Peer]
+    # Name = two
+    # Name = shadow
+    AllowedIPs = 10.10.0.3/32
+    PublicKey = dHdv
+    PublicKey = aWdub3JlZA==
+
+    [NotAPeer]
+    # Name = three
+    PublicKey = dGhyZWU=
+
+    [Peer]
+    # Name = shadow
+    AllowedIPs = 10.10.0.4/32
+    PublicKey = c2hhZG93
+''')
+
+class TestMappedFile(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'wg0.conf'
+        self.path.write_text(TEXT)
+        self.mapped = MappedFile(self.path)
+
+    def tearDown(self):
+        self.mapped.close()
+        self.tmp_dir.cleanup()
+
+    def test_counts(self):
+        self.assertEqual(self.mapped.peer_count(), 3)
+        self.assertEqual(self.mapped.count('Interface'), 1)
+
+    def test_interface_option(self):
+        self.assertEqual(self.mapped.interface_option('ListenPort'), '51821')
+        self.assertEqual(self.mapped.interface_option('Address'), '10.10.0.1/32')
+        self.assertIsNone(self.mapped.interface_option('MTU'))
+
+    def test_lookup_by_name(self):
+        self.assertTrue(self.mapped.has_peer(name='one'))
+        self.assertTrue(self.mapped.has_peer(name='two'))
+        self.assertFalse(self.mapped.has_peer(name='three'))
+        self.assertFalse(self.mapped.has_peer(name='nope'))
+
+        shadow = self.mapped.find_peer(name='shadow')
+        self.assertEqual(shadow.public_key, 'c2hhZG93')
+
+    def test_lookup_by_public_key(self):
+        self.assertEqual(self.mapped.find_peer(public_key='dHdv').name, 'two')
+        self.assertIsNone(self.mapped.find_peer(public_key='aWdub3JlZA=='))
+        self.assertIsNone(self.mapped.find_peer(public_key='dGhyZWU='))
+        self.assertIsNone(self.mapped.find_peer(public_key='not-a-peer'))
+        self.assertTrue(self.mapped.has_peer(name='one', public_key='b25l'))
+        self.assertFalse(self.mapped.has_peer(name='one', public_key='dHdv'))
+        self.assertRaises(ValueError, self.mapped.has_peer)
+
+    def test_agrees_with_file(self):
+        file = self.mapped.file()
+        self.assertEqual(str(file), str(File(self.path)))
+        self.assertEqual(
+            str(self.mapped.find_peer(name='two')),
+            str(list(file.sections())[3]),
+        )
+
+    def test_empty(self):
+        self.path.write_text('')
+        with MappedFile(self.path) as mapped:
+            self.assertEqual(mapped.peer_count(), 0)
+            self.assertFalse(mapped.has_peer(name='one'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+from unittest import TestCase, main
+from tempfile import TemporaryDirectory
+from pathlib import Path
+import marshal
+import os
+import stat
+
+from wgconf.file import File
+from wgconf.parse_cache import ParseCache, _MAGIC as MAGIC
+
+from test_helpers import *
+
+FILE_PATH = DATA_DIR / 'file' / 'duplicate_options.conf'
+
+class TestParseCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'test.conf'
+        self.path.write_text(FILE_PATH.read_text())
+        self.cache = ParseCache(Path(self.tmp_dir.name) / 'cache')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_miss_then_hit(self):
+        first = File(self.path, dup='list', parse_cache=self.cache)
+        self.assertEqual(self.cache.stats, (0, 1))
+        second = File(self.path, dup='list', parse_cache=self.cache)
+        self.assertEqual(self.cache.stats, (1, 1))
+
+        self.assertEqual(str(second), str(File(self.path, dup='list')))
+        self.assertEqual(str(second), str(first))
+        self.assertEqual(
+            second['Service']['ExecStart'], ['one', 'two', 'three']
+        )
+
+    def test_change_invalidates(self):
+        File(self.path, parse_cache=self.cache)
+        self.path.write_text(self.path.read_text() + '\n[Extra]\nA = b\n')
+        file = File(self.path, parse_cache=self.cache)
+        self.assertEqual(self.cache.stats, (0, 2))
+        self.assertEqual(file['Extra']['A'], 'b')
+        File(self.path, parse_cache=self.cache)
+        self.assertEqual(self.cache.stats, (1, 2))
+
+    def test_same_stat_other_content(self):
+        File(self.path, parse_cache=self.cache)
+        stat_result = os.stat(self.path)
+        text = self.path.read_text()
+        self.path.write_text(text.replace('one', 'uno'))
+        os.utime(self.path, ns=(stat_result.st_atime_ns,
+                                stat_result.st_mtime_ns))
+        file = File(self.path, dup='list', parse_cache=self.cache)
+        self.assertEqual(self.cache.stats, (0, 2))
+        self.assertEqual(file['Service']['ExecStart'][0], 'uno')
+
+    def test_corrupt_entry(self):
+        File(self.path, parse_cache=self.cache)
+        self.cache.entry_path(self.path).write_bytes(b'junk')
+        file = File(self.path, parse_cache=self.cache)
+        self.assertEqual(self.cache.stats, (0, 2))
+        self.assertEqual(str(file), str(File(self.path)))
+
+    def test_entry_kinds_and_strings_disagree(self):
+        data = self.path.read_bytes()
+        key = self.cache.key(self.path, data)
+        lines = list(File(self.path).lines())
+        for strings in (['x'], ['x'] * 1000):
+            with self.subTest(strings=len(strings)):
+                self.cache.put(self.path, key, lines)
+                entry_path = self.cache.entry_path(self.path)
+                entry = entry_path.read_bytes()
+                entry_key, kinds, _ = marshal.loads(entry[len(MAGIC):])
+                entry_path.write_bytes(
+                    MAGIC + marshal.dumps((entry_key, kinds, strings))
+                )
+                self.assertIsNone(self.cache.get(self.path, key))
+                self.assertFalse(entry_path.exists())
+
+    def test_entry_permissions(self):
+        File(self.path, parse_cache=self.cache)
+        mode = stat.S_IMODE(os.stat(self.cache.entry_path(self.path)).st_mode)
+        self.assertEqual(mode, 0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(self.cache.dir).st_mode), 0o700)
+
+if __name__ == '__main__':
+    main()
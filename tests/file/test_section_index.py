@@ -0,0 +1,181 @@
+from unittest import TestCase, main
+
+from wgconf.file import File
+from wgconf.line import SectionHead
+from wgconf.section import Section
+from wgconf.config import Config
+from wgconf.interface import Interface
+
+from test_helpers import *
+
+TEXT = unblock("""
+    # Top
+
+    [Interface]
+    Address = 10.0.0.1/32
+
+    [Peer]
+    # Name = a
+    PublicKey = a=
+
+    [Other]
+    X = y
+
+    [Peer]
+    # Name = b
+    PublicKey = b=
+    """)
+
+def walk_heads(file):
+    return [line for line in file.lines() if isinstance(line, SectionHead)]
+
+def names(sections):
+    return [section.get_meta('Name') for section in sections]
+
+class TestSectionIndex(TestCase):
+    def setUp(self):
+        self.file = File.from_string(TEXT)
+
+    def check(self):
+        heads = walk_heads(self.file)
+        indexed = [section.head for section in self.file.sections()][1:]
+        self.assertEqual(len(heads), len(indexed))
+        for head, other in zip(heads, indexed):
+            self.assertIs(head, other)
+        for kind in ('Interface', 'Peer', 'Other'):
+            self.assertEqual(
+                [section.head for section in self.file.sections(kind)],
+                [head for head in heads if head.value == kind],
+            )
+
+    def test_sections_by_kind(self):
+        self.assertEqual(names(self.file.sections('Peer')), ['a', 'b'])
+        self.assertEqual(self.file['Other']['X'], 'y')
+        self.assertEqual(self.file.section('Interface').kind, 'Interface')
+        self.assertIsNone(self.file.section('Nope'))
+        self.assertEqual(list(self.file.sections('Nope')), [])
+        self.check()
+
+    def test_add_section(self):
+        list(self.file.sections())  # Build the index first
+        section = Section(SectionHead('Peer'))
+        section.set_meta('Name', 'c')
+        self.file.add_section(section)
+        self.assertEqual(names(self.file.sections('Peer')), ['a', 'b', 'c'])
+        self.check()
+
+    def test_remove(self):
+        peer = self.file.section('Peer')
+        peer.remove()
+        self.assertEqual(names(self.file.sections('Peer')), ['b'])
+        self.assertNotIn('[Peer]\n# Name = a', str(self.file))
+        self.check()
+
+    def test_remove_while_iterating(self):
+        for peer in self.file.sections('Peer'):
+            peer.remove()
+        self.assertEqual(list(self.file.sections('Peer')), [])
+        self.check()
+
+    def test_replace(self):
+        replacement = Section(SectionHead('Other'))
+        replacement['Z'] = 'w'
+        self.file.section('Peer').replace(replacement)
+        self.assertEqual(names(self.file.sections('Peer')), ['b'])
+        self.assertEqual(
+            [section['Z'] for section in self.file.sections('Other')],
+            ['w', None],
+        )
+        self.check()
+
+    def test_replace_in_place(self):
+        self.file._index()
+        heads, peers = self.file._heads, self.file._heads_by_kind['Peer']
+        replacement = Section(SectionHead('Peer'))
+        replacement.set_meta('Name', 'c')
+        self.file.section('Peer').replace(replacement)
+
+        # Swapped into the same dicts, not rebuilt
+        self.assertIs(self.file._heads, heads)
+        self.assertIs(self.file._heads_by_kind['Peer'], peers)
+        self.assertEqual(names(self.file.sections('Peer')), ['c', 'b'])
+        self.check()
+
+        # And it can go again
+        self.file.section('Peer').remove()
+        self.assertEqual(names(self.file.sections('Peer')), ['b'])
+        self.check()
+
+    def test_version(self):
+        list(self.file.sections())
+        version = self.file.version
+        self.file.section('Peer')['Endpoint'] = '1.2.3.4:5'
+        self.assertGreater(self.file.version, version)
+
+        version = self.file.version
+        self.assertEqual(names(self.file.sections('Peer')), ['a', 'b'])
+        str(self.file)
+        self.assertEqual(self.file.version, version)
+
+        for change in (
+            lambda: self.file.section('Other').remove(),
+            lambda: self.file.section('Peer').set_meta('Name', 'c'),
+            lambda: self.file.add_section(Section(SectionHead('Other'))),
+        ):
+            version = self.file.version
+            change()
+            self.assertGreater(self.file.version, version)
+
+    def test_heads_linked_through_lines(self):
+        list(self.file.sections())  # Build the index first
+        middle = SectionHead('Peer')
+        self.file.section('Other').head.insert_prev(middle)
+        self.assertEqual(names(self.file.sections('Peer')), ['a', None, 'b'])
+        self.check()
+
+        first = SectionHead('Other')
+        self.file.section('Interface').head.insert_prev(first)
+        self.check()
+
+        self.file.last_line.insert_next(SectionHead('Peer'))
+        self.check()
+
+        middle.remove()
+        first.remove()
+        self.assertEqual(names(self.file.sections('Peer')), ['a', 'b', None])
+        self.check()
+
+    def test_kind_changed(self):
+        list(self.file.sections())
+        self.file.section('Other').head.value = 'Peer'
+        self.assertEqual(names(self.file.sections('Peer')), ['a', None, 'b'])
+        self.assertIsNone(self.file.section('Other'))
+        self.check()
+
+    def test_lazy(self):
+        path = DATA_DIR / 'file' / 'duplicate_options.conf'
+        file = File(path, lazy=True)
+        self.assertEqual(
+            [section.kind for section in file.sections()],
+            [section.kind for section in File(path).sections()],
+        )
+        self.assertFalse(
+            any(head.is_loaded for head in file._heads.values())
+        )
+
+    def test_config_interface(self):
+        config = Config(hostname='testy.example.com', name=None, dir=None)
+        self.assertIsNone(config.interface)
+        config.create_interface()
+        first = config.interface
+        config.interface = Interface.create(
+            name='new', address=['10.1.0.1/32'], private_key='x',
+        )
+        self.assertEqual(config.interface.name, 'new')
+        self.assertIsNone(first.head.owner)
+        self.assertEqual(len(list(config.file.sections('Interface'))), 1)
+        del config.interface
+        self.assertIsNone(config.interface)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+from unittest import TestCase, main
+
+from wgconf.config import Config
+from wgconf.file import File
+from wgconf.line import Comment, Option, SectionHead
+from wgconf.peer import Peer
+
+from test_helpers import *
+
+TEXT = unblock('''
+    # Default section comment
+
+    [Interface]
+    # Name = wg0
+    Address = 10.10.0.1/32
+    PrivateKey = cHJpdmF0ZQ==
+
+    [Peer]
+    # Name = one
+    AllowedIPs = 10.10.0.2/32
+    PublicKey = b25l
+
+    [Peer]
+    # Name = two
+    AllowedIPs = 10.10.0.3/32
+    PublicKey = dHdv
+
+    [Peer]
+    # Name = three
+    AllowedIPs = 10.10.0.4/32
+    PublicKey = dGhyZWU=
+''')
+
+def peer(file, name):
+    return next(
+        Peer(section.head)
+        for section in file.sections('Peer')
+        if section.name == name
+    )
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.file = File.from_string(TEXT)
+
+    def test_unchanged(self):
+        snapshot = self.file.snapshot()
+        self.assertEqual(str(snapshot), TEXT)
+        self.assertIs(self.file.snapshot(), snapshot)
+        self.assertEqual(list(snapshot.diff(self.file.snapshot())), [])
+
+    def test_changes_share_the_rest(self):
+        before = self.file.snapshot()
+        peer(self.file, 'two').allowed_ips = '10.10.0.5/32'
+        after = self.file.snapshot()
+
+        self.assertIsNot(after, before)
+        self.assertEqual(str(before), TEXT)
+        self.assertEqual(str(after), str(self.file))
+        self.assertEqual(
+            [a is b for a, b in zip(before.sections, after.sections)],
+            [True, True, True, False, True],
+        )
+
+    def test_every_kind_of_change(self):
+        changes = (
+            lambda file: peer(file, 'one').update(endpoint='1.2.3.4:5'),
+            lambda file: peer(file, 'one').set_meta('Description', 'x'),
+            lambda file: peer(file, 'one').delete_meta('Name'),
+            lambda file: peer(file, 'three').remove(),
+            lambda file: file.add_section(
+                Peer.create(name='four', allowed_ips='10.10.0.6/32',
+                            public_key='Zm91cg==')
+            ),
+            lambda file: file.default_section.set_meta('Name', 'x'),
+            lambda file: setattr(peer(file, 'two').head, 'value', 'Other'),
+            lambda file: setattr(
+                peer(file, 'two')._options_named('AllowedIPs')[0],
+                'name',
+                'Endpoint',
+            ),
+            # Straight through `Line` methods
+            lambda file: peer(file, 'one').head.insert_prev(
+                SectionHead('Other')
+            ),
+            lambda file: file.last_line.insert_next(SectionHead('Other')),
+            lambda file: peer(file, 'two').head.remove(),
+            lambda file: peer(file, 'two').head.next.insert_next(
+                Option('Endpoint', '1.2.3.4:5')
+            ),
+        )
+        for change in changes:
+            with self.subTest(change=change):
+                file = File.from_string(TEXT)
+                file.snapshot()
+                change(file)
+                self.assertEqual(str(file.snapshot()), str(file))
+
+    def test_branch(self):
+        snapshot = self.file.snapshot()
+        branch = File.from_snapshot(snapshot)
+        self.assertIs(branch.snapshot(), snapshot)
+
+        # Reading doesn't stop the sharing...
+        self.assertEqual(peer(branch, 'one').public_key, 'b25l')
+        self.assertIs(branch.snapshot(), snapshot)
+
+        # ...changing does, for just the one section
+        peer(branch, 'one').public_key = 'T05F'
+        changed = branch.snapshot()
+        self.assertEqual(
+            [a is b for a, b in zip(snapshot.sections, changed.sections)],
+            [True, True, False, True, True],
+        )
+        self.assertEqual(str(self.file), TEXT)
+        self.assertEqual(str(snapshot), TEXT)
+        self.assertEqual(
+            str(changed), TEXT.replace('PublicKey = b25l', 'PublicKey = T05F')
+        )
+
+    def test_diff(self):
+        snapshot = self.file.snapshot()
+        branch = File.from_snapshot(snapshot)
+        peer(branch, 'three').allowed_ips = '10.10.0.9/32'
+        peer(branch, 'one').remove()
+
+        self.assertEqual(
+            list(snapshot.diff(branch.snapshot(), 'a', 'b')),
+            [
+                '--- a',
+                '+++ b',
+                '@@ -8,5 +7,0 @@',
+                '-[Peer]',
+                '-# Name = one',
+                '-AllowedIPs = 10.10.0.2/32',
+                '-PublicKey = b25l',
+                '-',
+                # Context doesn't reach into the shared [Peer] two
+                '@@ -18,5 +13,5 @@',
+                ' [Peer]',
+                ' # Name = three',
+                '-AllowedIPs = 10.10.0.4/32',
+                '+AllowedIPs = 10.10.0.9/32',
+                ' PublicKey = dGhyZWU=',
+                ' ',
+            ],
+        )
+
+    def test_config_what_if(self):
+        config = Config(hostname='testy.example.com', dir=None, name=None)
+        config.file = File.from_string(TEXT)
+        snapshot = config.file.snapshot()
+
+        config.file = File.from_snapshot(snapshot)
+        config.update_peers({'two': None})
+        self.assertIsNone(config.peer('two'))
+        self.assertEqual(str(snapshot), TEXT)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+from unittest import TestCase, main
+from pathlib import Path
+from subprocess import CalledProcessError
+import asyncio
+import sys
+import tempfile
+
+from wgconf.keys import PythonKeyBackend, WgKeyBackend
+
+# Stands in for the `wg` binary so the subprocess path can be exercised
+# without WireGuard installed
+FAKE_WG = f'''#!{sys.executable}
+import sys
+sys.path.insert(0, {str(Path(__file__).resolve().parents[2])!r})
+from wgconf.keys import PythonKeyBackend
+keys = PythonKeyBackend()
+command = sys.argv[1]
+if command == 'genkey':
+    print(keys.genkey())
+elif command == 'pubkey':
+    try:
+        print(keys.pubkey(sys.stdin.read()))
+    except ValueError:
+        sys.exit(1)
+elif command == 'genpsk':
+    print(keys.genpsk())
+else:
+    sys.exit(1)
+'''
+
+class TestAsyncKeys(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.wg_bin_path = Path(cls.tmp_dir.name) / 'wg'
+        cls.wg_bin_path.write_text(FAKE_WG)
+        cls.wg_bin_path.chmod(0o755)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_python_backend(self):
+        keys = PythonKeyBackend()
+
+        async def go():
+            private_key = await keys.async_genkey()
+            return (
+                private_key,
+                await keys.async_pubkey(private_key),
+                await keys.async_genkeys(5, concurrency=2),
+            )
+
+        private_key, public_key, key_sets = asyncio.run(go())
+        self.assertEqual(public_key, keys.pubkey(private_key))
+        self.assertEqual(len(key_sets), 5)
+        for key_set in key_sets:
+            self.assertEqual(keys.pubkey(key_set.private_key), key_set.public_key)
+
+    def test_bad_concurrency(self):
+        for keys in (PythonKeyBackend(), WgKeyBackend(self.wg_bin_path)):
+            for concurrency in (0, -1):
+                with self.subTest(keys=keys, concurrency=concurrency):
+                    with self.assertRaises(ValueError):
+                        asyncio.run(
+                            keys.async_genkeys(2, concurrency=concurrency)
+                        )
+
+    def test_wg_backend(self):
+        keys = WgKeyBackend(self.wg_bin_path)
+        key_sets = asyncio.run(keys.async_genkeys(3, concurrency=2))
+        self.assertEqual(len(key_sets), 3)
+        for key_set in key_sets:
+            self.assertEqual(
+                PythonKeyBackend().pubkey(key_set.private_key),
+                key_set.public_key,
+            )
+            self.assertEqual(len(key_set.preshared_key), 44)
+
+    def test_wg_backend_error(self):
+        keys = WgKeyBackend(self.wg_bin_path)
+        self.assertRaises(
+            CalledProcessError,
+            asyncio.run,
+            keys.async_pubkey('nope'),
+        )
+
+if __name__ == '__main__':
+    main()
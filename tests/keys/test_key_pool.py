@@ -0,0 +1,104 @@
+from unittest import TestCase, main
+from threading import Thread
+import time
+
+from wgconf.config import Config
+from wgconf.keys import PythonKeyBackend
+from wgconf.key_pool import KeyPool
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting")
+        time.sleep(0.01)
+
+class FlakyBackend(PythonKeyBackend):
+    """Fails the first `failures` batches, slowly."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+
+    def genkeys(self, n, preshared_keys=True):
+        time.sleep(0.01)
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("No entropy today")
+        return super().genkeys(n, preshared_keys)
+
+class TestKeyPool(TestCase):
+    def test_fill_and_draw(self):
+        with KeyPool(size=4, low_water=2, start=False) as pool:
+            pool.fill()
+            self.assertEqual(pool.stats.keypairs, 4)
+            self.assertEqual(pool.stats.psks, 4)
+
+            private_key = pool.genkey()
+            self.assertEqual(
+                pool.pubkey(private_key),
+                PythonKeyBackend().pubkey(private_key),
+            )
+            pool.genpsk()
+
+            self.assertEqual(pool.stats.hits, 2)
+            self.assertEqual(pool.stats.misses, 0)
+
+    def test_misses_when_empty(self):
+        with KeyPool(size=4, low_water=0, start=False) as pool:
+            key_sets = pool.genkeys(2)
+            self.assertEqual(len(key_sets), 2)
+            self.assertEqual(pool.stats.hits, 0)
+            self.assertEqual(pool.stats.misses, 4)
+
+    def test_background_refill(self):
+        with KeyPool(size=8, low_water=4) as pool:
+            wait_for(lambda: pool.stats.keypairs == 8 and pool.stats.psks == 8)
+            for _ in range(5):
+                pool.genkey()
+            wait_for(lambda: pool.stats.keypairs == 8)
+            self.assertEqual(pool.stats.hits, 5)
+
+    def test_config_draws_from_pool(self):
+        with KeyPool(size=8, low_water=2, start=False) as pool:
+            pool.fill()
+            config = Config(hostname='testy.example.com', keys=pool)
+            config.create_interface()
+            client = config.add_client(name='a', private_address='10.10.0.2')
+
+            self.assertEqual(
+                config.peer('a').public_key,
+                PythonKeyBackend().pubkey(client.interface.private_key),
+            )
+            self.assertEqual(pool.stats.misses, 0)
+            self.assertEqual(pool.stats.hits, 3)
+
+    def test_refill_failure_restarts(self):
+        with KeyPool(FlakyBackend(failures=1), size=4, low_water=4) as pool:
+            with self.assertLogs('wgconf.key_pool'):
+                wait_for(lambda: pool.error is not None)
+                wait_for(lambda: pool._thread is None)
+            pool.genkey()
+            wait_for(lambda: pool.stats.keypairs == 4)
+
+    def test_closed_stays_closed(self):
+        pool = KeyPool(size=4, low_water=4, start=False)
+        pool.close()
+        pool.genkey()
+        self.assertIsNone(pool._thread)
+        self.assertEqual(pool.stats.keypairs, 0)
+
+    def test_fill_never_overfills(self):
+        with KeyPool(FlakyBackend(), size=4, start=False) as pool:
+            threads = [Thread(target=pool.fill) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(pool.stats.keypairs, 4)
+            self.assertEqual(pool.stats.psks, 4)
+
+    def test_bad_low_water(self):
+        self.assertRaises(ValueError, KeyPool, size=4, low_water=5, start=False)
+
+if __name__ == '__main__':
+    main()
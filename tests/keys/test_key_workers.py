@@ -0,0 +1,45 @@
+from unittest import TestCase, main
+import asyncio
+
+from wgconf.config import Config
+from wgconf.keys import PythonKeyBackend
+from wgconf.key_workers import ProcessPoolKeyBackend
+
+class TestProcessPoolKeyBackend(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = ProcessPoolKeyBackend(PythonKeyBackend(), workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_genkey_pubkey(self):
+        private_key = self.pool.genkey()
+        self.assertEqual(
+            self.pool.pubkey(private_key),
+            PythonKeyBackend().pubkey(private_key),
+        )
+        self.assertEqual(len(self.pool.genpsk()), 44)
+
+    def test_genkeys_spreads_batch(self):
+        key_sets = self.pool.genkeys(5)
+        self.assertEqual(len(key_sets), 5)
+        self.assertEqual(len({ks.private_key for ks in key_sets}), 5)
+        self.assertEqual(self.pool.genkeys(0), [])
+
+    def test_bad_concurrency(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(self.pool.async_genkeys(2, concurrency=0))
+
+    def test_config(self):
+        config = Config(hostname='testy.example.com', keys=self.pool)
+        config.create_interface()
+        client = config.add_client(name='a', private_address='10.10.0.2')
+        self.assertEqual(
+            client.peer().public_key,
+            PythonKeyBackend().pubkey(config.interface.private_key),
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+from unittest import TestCase, main, skipUnless
+from base64 import b64encode
+from pathlib import Path
+
+from wgconf.keys import PythonKeyBackend, WgKeyBackend, x25519, decode_key
+from wgconf.util import DEFAULT_WG_BIN_PATH
+
+def b64(hex_str: str) -> str:
+    return b64encode(bytes.fromhex(hex_str)).decode('ascii')
+
+# RFC 7748, section 6.1
+ALICE_PRIVATE = '77076d0a7318a57d3c16c17251b26645df4c2f87ebc0992ab177fba51db92c2a'
+ALICE_PUBLIC = '8520f0098930a754748b7ddcb43ef75a0dbf3a0d26381af4eba4a98eaa9b4e6a'
+BOB_PRIVATE = '5dab087e624a8a4b79e17f8b83800ee66f3bb1292618b6fd1c2f8b27ff88e0eb'
+BOB_PUBLIC = 'de9edb7d7b7dc1b4d35b61c2ece435373f8343c85b78674dadfc7e146f882b4f'
+SHARED = '4a5d9d5ba4ce2de1728e3bf480350f25e07e21c947d19e3376f09b3c1e161742'
+
+class TestPythonKeyBackend(TestCase):
+    def setUp(self):
+        self.keys = PythonKeyBackend()
+
+    def test_rfc7748_vector(self):
+        self.assertEqual(
+            x25519(
+                bytes.fromhex(
+                    'a546e36bf0527c9d3b16154b82465edd'
+                    '62144c0ac1fc5a18506a2244ba449ac4'
+                ),
+                bytes.fromhex(
+                    'e6db6867583030db3594c1a424b15f7c'
+                    '726624ec26b3353b10a903a6d0ab1c4c'
+                ),
+            ).hex(),
+            'c3da55379de9c6908e94ea4df28d084f32eccf03491c71f754b4075577a28552',
+        )
+
+    def test_rfc7748_diffie_hellman(self):
+        self.assertEqual(self.keys.pubkey(b64(ALICE_PRIVATE)), b64(ALICE_PUBLIC))
+        self.assertEqual(self.keys.pubkey(b64(BOB_PRIVATE)), b64(BOB_PUBLIC))
+        self.assertEqual(
+            x25519(bytes.fromhex(ALICE_PRIVATE), bytes.fromhex(BOB_PUBLIC)),
+            bytes.fromhex(SHARED),
+        )
+
+    def test_genkey_is_clamped(self):
+        for _ in range(16):
+            raw = decode_key(self.keys.genkey())
+            self.assertEqual(raw[0] & 7, 0)
+            self.assertEqual(raw[31] & 128, 0)
+            self.assertEqual(raw[31] & 64, 64)
+
+    def test_genpsk(self):
+        self.assertEqual(len(decode_key(self.keys.genpsk())), 32)
+        self.assertNotEqual(self.keys.genpsk(), self.keys.genpsk())
+
+    def test_bad_key(self):
+        self.assertRaises(ValueError, self.keys.pubkey, 'not-a-key')
+        self.assertRaises(ValueError, self.keys.pubkey, b64('00' * 31) + '=')
+
+    @skipUnless(Path(DEFAULT_WG_BIN_PATH).exists(), "`wg` binary not found")
+    def test_matches_wg(self):
+        wg = WgKeyBackend()
+        for _ in range(4):
+            private_key = wg.genkey()
+            self.assertEqual(self.keys.pubkey(private_key), wg.pubkey(private_key))
+            private_key = self.keys.genkey()
+            self.assertEqual(self.keys.pubkey(private_key), wg.pubkey(private_key))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+from unittest import TestCase, main
+from base64 import b64encode
+from sys import intern
+
+from wgconf.file import File
+from wgconf.line import (
+    Blank,
+    Comment,
+    Option,
+    SectionHead,
+    DefaultSectionHead,
+)
+
+from test_helpers import *
+
+# Byte counts depend on the interpreter; see dev/bench/memory.py for them
+
+def key(index):
+    return b64encode(index.to_bytes(32, 'little')).decode('ascii')
+
+def config_text(peers):
+    return ''.join(
+        f"[Peer]\n# Name = peer-{index}\nAllowedIPs = 10.0.{index >> 8 & 255}."
+        + f"{index & 255}/32\nPublicKey = {key(index)}\n"
+        + f"PresharedKey = {key(index + peers)}\n\n"
+        for index in range(peers)
+    )
+
+class TestMemory(TestCase):
+    def test_no_instance_dicts(self):
+        for line in (
+            Blank(),
+            Comment('x'),
+            Option(name='A', value='b'),
+            SectionHead('Peer'),
+            DefaultSectionHead(),
+        ):
+            with self.subTest(type(line).__name__):
+                self.assertFalse(hasattr(line, '__dict__'))
+
+    def test_parsed_lines_have_no_dicts(self):
+        file = File.from_string(config_text(2))
+        for line in file.lines():
+            self.assertFalse(hasattr(line, '__dict__'), repr(line))
+
+    def test_option_names_are_shared(self):
+        file = File.from_string(config_text(2))
+        names = [
+            line.name for line in file.lines()
+            if isinstance(line, Option) and line.name == 'PublicKey'
+        ]
+        self.assertEqual(len(names), 2)
+        for name in names:
+            self.assertIs(name, intern('PublicKey'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+from unittest import TestCase, main
+from dataclasses import MISSING, fields
+
+from wgconf.util import find_map
+from wgconf.line import Blank, Comment, Option, SectionHead, parse_line
+
+LINES = (
+    '',
+    '   ',
+    '\t',
+    '#',
+    '# ',
+    '# Name = wg0',
+    '#no-space',
+    '#  two spaces',
+    '[Interface]',
+    '[Peer]   ',
+    '[Peer',
+    '[Pe er]',
+    'PublicKey = abc=',
+    'AllowedIPs=10.0.0.1/32, 10.0.0.2/32',
+    'MTU   =   1420   ',
+    'Address =',
+    '= value',
+    'Bad-Name = x',
+    '  Indented = x',
+    'just words',
+)
+
+class TestParseLine(TestCase):
+    def test_matches_per_class_parsing(self):
+        for string in LINES:
+            with self.subTest(string=string):
+                expected = find_map(
+                    (Blank, Comment, SectionHead, Option),
+                    lambda c: c.from_string(string)
+                )
+                self.assertEqual(parse_line(string), expected)
+
+    def test_kinds(self):
+        self.assertIsInstance(parse_line(''), Blank)
+        self.assertEqual(parse_line('# x = y'), Comment('x = y'))
+        self.assertEqual(parse_line('[Peer]'), SectionHead('Peer'))
+        self.assertEqual(
+            parse_line('ListenPort = 51820 '),
+            Option(name='ListenPort', value='51820'),
+        )
+        self.assertIsNone(parse_line('nope'))
+
+    def test_fields(self):
+        for cls, names in (
+            (Comment, ['value']),
+            (Option, ['name', 'value']),
+            (SectionHead, ['value']),
+        ):
+            with self.subTest(cls=cls.__name__):
+                self.assertEqual([f.name for f in fields(cls)], names)
+                for field in fields(cls):
+                    self.assertIs(field.default, MISSING)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+from unittest import TestCase, main
+
+from wgconf.file import File
+from wgconf.line import Comment
+
+from test_helpers import *
+
+TEXT = unblock("""
+    [Peer]
+    # Name = a
+    # Just a comment
+    PublicKey = a=
+    # Description = first
+    """)
+
+class TestMetaIndex(TestCase):
+    def setUp(self):
+        self.file = File.from_string(TEXT)
+        self.peer = self.file['Peer']
+
+    def comment(self, value):
+        return next(c for c in self.peer.comments() if c.value == value)
+
+    def test_parse_is_cached(self):
+        comment = self.comment('Name = a')
+        self.assertEqual(comment.meta, ('Name', 'a'))
+        self.assertIs(comment.meta, comment.meta)
+        self.assertIsNone(self.comment('Just a comment').meta)
+
+    def test_get(self):
+        self.assertEqual(self.peer.get_meta('Name'), 'a')
+        self.assertEqual(self.peer.get_meta('Description'), 'first')
+        self.assertIsNone(self.peer.get_meta('Nope'))
+        self.assertTrue(self.peer.has_meta('Name'))
+
+    def test_set_and_delete(self):
+        self.peer.set_meta('Name', 'b')
+        self.assertEqual(self.peer.get_meta('Name'), 'b')
+        self.peer.set_meta('Owner', 'me')
+        self.assertEqual(self.peer.get_meta('Owner'), 'me')
+        self.assertIn('# Description = first\n# Owner = me', str(self.peer))
+        self.peer.delete_meta('Name')
+        self.assertIsNone(self.peer.get_meta('Name'))
+        self.assertNotIn('Name', str(self.peer))
+
+    def test_comment_value_change_reindexes(self):
+        self.assertEqual(self.peer.get_meta('Name'), 'a')  # Build the index
+        self.comment('Name = a').value = 'Label = x'
+        self.assertIsNone(self.peer.get_meta('Name'))
+        self.assertEqual(self.peer.get_meta('Label'), 'x')
+        self.comment('Just a comment').value = 'Name = c'
+        self.assertEqual(self.peer.get_meta('Name'), 'c')
+
+    def test_dups_first_wins(self):
+        self.assertEqual(self.peer.get_meta('Name'), 'a')
+        self.peer.head.next.insert_next(Comment('Name = second'))
+        self.peer.head.insert_next(Comment('Name = zeroth'))
+        self.assertEqual(self.peer.get_meta('Name'), 'zeroth')
+        self.peer.head.next.remove()
+        self.assertEqual(self.peer.get_meta('Name'), 'a')
+        self.peer.delete_meta('Name')
+        self.assertIsNone(self.peer.get_meta('Name'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+from unittest import TestCase, main
+
+from wgconf.file import File
+from wgconf.line import Blank, Option
+
+from test_helpers import *
+
+TEXT = unblock("""
+    Top = level
+
+    [Service]
+    ExecStart = one
+    Type = simple
+    ExecStart = two
+
+    [Install]
+    WantedBy = multi-user.target
+    """)
+
+def scan(section, name):
+    return [
+        line for line in section
+        if isinstance(line, Option) and line.name == name
+    ]
+
+class TestOptionIndex(TestCase):
+    def setUp(self):
+        self.file = File.from_string(TEXT, dup='list')
+        self.service = self.file['Service']
+
+    def check(self, section, name):
+        indexed = section._options_named(name)
+        scanned = scan(section, name)
+        self.assertEqual(len(indexed), len(scanned))
+        for option, other in zip(indexed, scanned):
+            self.assertIs(option, other)
+
+    def test_get(self):
+        self.assertEqual(self.service['ExecStart'], ['one', 'two'])
+        self.assertEqual(self.service['Type'], 'simple')
+        self.assertIsNone(self.service['WantedBy'])
+        self.assertIn('Type', self.service)
+        self.assertNotIn('WantedBy', self.service)
+        self.assertEqual(self.file['Top'], 'level')
+
+    def test_index_survives_new_section_views(self):
+        self.service['Type'] = 'forking'
+        self.assertIs(
+            self.file['Service'].head.option_index,
+            self.service.head.option_index,
+        )
+        self.assertEqual(self.file['Service']['Type'], 'forking')
+
+    def test_set_list(self):
+        self.service['ExecStart'] = ['a', 'b', 'c']
+        self.assertEqual(self.service['ExecStart'], ['a', 'b', 'c'])
+        self.check(self.service, 'ExecStart')
+        self.service['ExecStart'] = ['z']
+        self.assertEqual(self.service['ExecStart'], 'z')
+        self.check(self.service, 'ExecStart')
+
+    def test_add_and_delete(self):
+        self.service['Restart'] = 'always'
+        self.assertEqual(self.service['Restart'], 'always')
+        self.check(self.service, 'Restart')
+        del self.service['ExecStart']
+        self.assertNotIn('ExecStart', self.service)
+        self.assertNotIn('ExecStart', str(self.file))
+        self.check(self.service, 'ExecStart')
+
+    def test_line_level_changes(self):
+        self.assertIn('Type', self.service)  # Build the index
+        first_exec = scan(self.service, 'ExecStart')[0]
+        first_exec.insert_next(Option(name='ExecStart', value='between'))
+        self.assertEqual(
+            self.service['ExecStart'], ['one', 'between', 'two']
+        )
+        self.check(self.service, 'ExecStart')
+
+        first_exec.insert_prev(Option(name='Before', value='x'))
+        self.assertEqual(self.service['Before'], 'x')
+        self.check(self.service, 'Before')
+
+        first_exec.remove()
+        self.assertEqual(self.service['ExecStart'], ['between', 'two'])
+        self.check(self.service, 'ExecStart')
+
+    def test_insert_at_section_boundary(self):
+        install = self.file['Install']
+        self.assertIn('WantedBy', install)
+        self.assertIn('Type', self.service)
+        # After the blank line that ends [Service], before [Install]
+        last_service_line = install.head.prev
+        self.assertIsInstance(last_service_line, Blank)
+        last_service_line.insert_next(Option(name='Late', value='yes'))
+        self.assertEqual(self.service['Late'], 'yes')
+        self.assertNotIn('Late', install)
+
+        # Right after a head belongs to that head's section
+        install.head.insert_next(Option(name='Early', value='yes'))
+        self.assertEqual(install['Early'], 'yes')
+        self.assertNotIn('Early', self.service)
+
+if __name__ == '__main__':
+    main()
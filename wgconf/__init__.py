@@ -1,3 +1,21 @@
 from .config import Config
+from .config_set import ConfigSet
+from .keys import KeyBackend, PythonKeyBackend, WgKeyBackend
+from .key_pool import KeyPool
+from .key_workers import ProcessPoolKeyBackend
+from .keystore import KeyStore, MemoryKeyStore, SQLiteKeyStore
+from .parse_cache import ParseCache
 
-__all__ = ('Config')
+__all__ = (
+    'Config',
+    'ConfigSet',
+    'KeyBackend',
+    'KeyPool',
+    'KeyStore',
+    'MemoryKeyStore',
+    'ParseCache',
+    'ProcessPoolKeyBackend',
+    'PythonKeyBackend',
+    'SQLiteKeyStore',
+    'WgKeyBackend',
+)
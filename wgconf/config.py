@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import (
+    Callable,
     Dict,
     Iterator,
     List,
@@ -9,26 +10,33 @@ from typing import (
     Optional,
 )
 from pathlib import Path
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager, nullcontext
+from inspect import signature
 
 from .util import (
-    DEFAULT_WG_BIN_PATH,
     PropValue,
     PropValues,
-    find,
     first,
-    genkey,
-    genpsk,
     normalize_address,
     normalize_client_address,
     pick,
-    pubkey,
     write,
     path_property,
 )
+from .keys import (
+    DEFAULT_KEY_BACKEND,
+    KeyBackend,
+    KeySet,
+    WgKeyBackend,
+    derive_key_set,
+)
+from .keystore import KeyStore
 from .file import File
+from .parse_cache import ParseCache
 from .peer import Peer
 from .interface import Interface
+from .line import SectionHead
 from .section import Section
 
 _SERVER_SIDE_PEER_UPDATE_KEYS = (
@@ -38,7 +46,86 @@ _SERVER_SIDE_PEER_UPDATE_KEYS = (
     set(("persistent_keepalive", "allowed_ips"))
 )
 
-_PeerUpdateAction = namedtuple("_PeerUpdateAction", "name type peer")
+# One [Peer] change in a `ConfigPlan`. `type` is "add", "modify" or
+# "remove"; `peer` is the existing [Peer] (`None` for adds), `update` our
+# own copy of the props and `changed` whether the file would really change
+PlanAction = namedtuple("PlanAction", "name type peer update changed")
+
+
+class ConfigPlan(
+    namedtuple(
+        "ConfigPlan",
+        "config file version interface interface_changed peers clients",
+    )
+):
+    """What `Config.update` would do, worked out by `Config.plan` without
+    touching anything: the [Interface] props (if any) and a list of
+    `PlanAction`s each for `peers` and `clients`. `file` and `version` are
+    the `File` it was worked out against and its `File.version` then.
+    """
+
+    __slots__ = ()
+
+    @property
+    def changed(self) -> bool:
+        """Would applying it change the file?"""
+        return self.interface_changed or any(
+            action.changed for action in (*self.peers, *self.clients)
+        )
+
+
+def _peer_address(peer: Peer) -> Optional[str]:
+    """A client [Peer]'s address: the first of its `AllowedIPs`."""
+    if allowed_ips := peer["AllowedIPs"]:
+        return allowed_ips.split(",", 1)[0].strip()
+    return None
+
+
+# What each of `Config`'s peer indexes files a [Peer] under
+_PEER_KEY_FUNCS = {
+    "name": lambda peer: peer.name,
+    "public_key": lambda peer: peer["PublicKey"],
+    "address": _peer_address,
+}
+
+
+class _PeerIndex:
+    """[Peer] heads by one key, each key's in file order, plus the key each
+    head was filed under (so it can be found again after the peer changes).
+    """
+
+    def __init__(self, key_func: Callable[[Peer], Optional[str]], heads):
+        self.key_func = key_func
+        self.heads: Dict[str, List[SectionHead]] = {}
+        self.keys: Dict[int, Optional[str]] = {}
+        for head in heads:
+            self.add(head)
+
+    def add(self, head: SectionHead) -> None:
+        key = self.key_func(Peer(head))
+        self.keys[id(head)] = key
+        if key is not None:
+            self.heads.setdefault(key, []).append(head)
+
+    def discard(self, head: SectionHead) -> None:
+        if id(head) not in self.keys:
+            return
+        if (key := self.keys.pop(id(head))) is not None:
+            heads = self.heads[key]
+            heads.remove(head)
+            if not heads:
+                del self.heads[key]
+
+    def update(self, head: SectionHead) -> None:
+        """Re-file `head` if its key changed."""
+        if self.key_func(Peer(head)) != self.keys.get(id(head)):
+            self.discard(head)
+            self.add(head)
+
+    def first(self, key: str) -> Optional[SectionHead]:
+        if heads := self.heads.get(key):
+            return heads[0]
+        return None
 
 
 class Config:
@@ -46,13 +133,20 @@ class Config:
     DEFAULT_DIR = Path("/etc/wireguard")
     DEFAULT_CLIENT_ALLOWED_IPS = ("0.0.0.0/0", "::/0")
     DEFAULT_PRIVATE_ADDRESS = "10.10.0.1/32"
+    PUBKEY_CACHE_SIZE = 4096
 
     hostname: str
     name: Optional[str]
     dir: Optional[Union[Path, str]]
     file: File
-    wg_bin_path: Path
     public_address: Optional[str]
+    store_public_key: bool
+    master_secret: Union[bytes, str, None]
+    keystore: Optional[KeyStore]
+
+    _keys: KeyBackend
+    _public_key: Optional[Tuple[str, str]]
+    _peer_indexes: Dict[str, _PeerIndex]
 
     dir = path_property("_dir", doc="Default directory to read/write config")
 
@@ -63,14 +157,113 @@ class Config:
         name: Optional[str] = DEFAULT_NAME,
         dir: Optional[Union[Path, str]] = DEFAULT_DIR,
         public_address: Optional[str] = None,
-        wg_bin_path: Union[str, Path] = DEFAULT_WG_BIN_PATH,
+        keys: Optional[KeyBackend] = None,
+        wg_bin_path: Union[str, Path, None] = None,
+        store_public_key: bool = False,
+        master_secret: Union[bytes, str, None] = None,
+        keystore: Optional[KeyStore] = None,
+        lazy: bool = False,
+        parse_cache: Optional[ParseCache] = None,
+        file: Optional[File] = None,
     ):
+        """`file` is an already-loaded `File` to use instead of reading one
+        from `path`.
+        """
+        if keys is None:
+            if wg_bin_path is None:
+                keys = DEFAULT_KEY_BACKEND
+            else:
+                keys = WgKeyBackend(wg_bin_path)
+        elif wg_bin_path is not None:
+            raise ValueError("Give `keys` or `wg_bin_path`, not both")
+
         self.hostname = hostname
         self.name = name
         self.dir = dir
-        self.file = File(self.path)
-        self.wg_bin_path = Path(wg_bin_path)
+        if file is None:
+            file = File(self.path, lazy=lazy, parse_cache=parse_cache)
+        self.file = file
+        self.keys = keys
         self.public_address = public_address
+        self.store_public_key = store_public_key
+        self.master_secret = master_secret
+        self.keystore = keystore
+        self._public_key = None
+        self._peer_indexes = {}
+        self._peer_indexes_file = None
+        self._peer_indexes_version = None
+
+        if store_public_key and (interface := self.interface):
+            # Trust what we wrote last time; `check_public_key` verifies it
+            if public_key := interface.public_key:
+                self._public_key = (interface.private_key, public_key)
+
+    def __get_keys(self) -> KeyBackend:
+        return self._keys
+
+    def __set_keys(self, keys: KeyBackend) -> None:
+        self._keys = keys
+        # Private key -> public key, least recently used first
+        self._pubkeys: OrderedDict = OrderedDict()
+
+    keys = property(
+        __get_keys,
+        __set_keys,
+        doc="The `KeyBackend` used to generate and derive keys",
+    )
+
+    def pubkey(self, private_key: str) -> str:
+        """Derive the public key for `private_key` via `keys`.
+
+        Memoized (LRU, `PUBKEY_CACHE_SIZE` entries); forgotten whenever
+        `keys` is set.
+        """
+        pubkeys = self._pubkeys
+        if (public_key := pubkeys.get(private_key)) is not None:
+            pubkeys.move_to_end(private_key)
+            return public_key
+        public_key = self.keys.pubkey(private_key)
+        pubkeys[private_key] = public_key
+        if len(pubkeys) > self.PUBKEY_CACHE_SIZE:
+            pubkeys.popitem(last=False)
+        return public_key
+
+    @property
+    def public_key(self) -> Optional[str]:
+        """Public key of the [Interface], derived once per `PrivateKey`.
+
+        With `store_public_key` on, the derived key is also written to the
+        [Interface] as a `# PublicKey = ...` meta comment, and a key found
+        there when the file is loaded is used without deriving anything.
+        """
+        if interface := self.interface:
+            private_key = interface.private_key
+            if self._public_key is None or self._public_key[0] != private_key:
+                self._public_key = (private_key, self.pubkey(private_key))
+                if self.store_public_key:
+                    interface.public_key = self._public_key[1]
+            return self._public_key[1]
+        return None
+
+    def check_public_key(self) -> bool:
+        """Derive the [Interface] public key and compare it to the one we're
+        using (which may have been trusted from a stored meta comment).
+
+        Fixes things up if they differ, and returns whether they matched.
+        """
+        if (interface := self.interface) is None:
+            return True
+        private_key = interface.private_key
+        public_key = self.pubkey(private_key)
+        matched = (
+            self._public_key is None or self._public_key[1] == public_key
+        ) and (
+            not self.store_public_key or interface.public_key == public_key
+        )
+        self._public_key = (private_key, public_key)
+        if self.store_public_key:
+            interface.public_key = public_key
+        return matched
 
     @property
     def filename(self) -> Optional[str]:
@@ -94,12 +287,7 @@ class Config:
         return f"{self.hostname}:{self.get_listen_port()}"
 
     def __get_interface(self) -> Optional[Interface]:
-        if (
-            section := find(
-                self.file.sections(),
-                lambda s: s.kind == "Interface",
-            )
-        ) :
+        if section := self.file.section("Interface"):
             return Interface(section.head)
         return None
 
@@ -138,7 +326,7 @@ class Config:
         save_config: Interface.save_config.type = None,
     ) -> Interface:
         if private_key is None:
-            private_key = genkey(self.wg_bin_path)
+            private_key = self.keys.genkey()
 
         if name is None:
             name = self.name
@@ -161,106 +349,415 @@ class Config:
 
         self.file.add_section(interface)
 
+        if self.store_public_key:
+            interface.public_key = self.public_key
+
         return interface
 
     def update_interface(self, **props: PropValue) -> None:
         if interface := self.interface:
             interface.update(**props)
+            if self.store_public_key:
+                interface.public_key = self.public_key
         else:
             self.create_interface(**props)
 
     def peers(self) -> Iterator[Peer]:
+        return (Peer(section.head) for section in self.file.sections("Peer"))
+
+    def reindex(self) -> None:
+        """Forget the peer indexes, to be rebuilt on next use. Any change to
+        the file other than through this `Config` does this by itself; it's
+        only needed for changes the file doesn't see either (lines linked in
+        straight through `Line` methods).
+        """
+        self._peer_indexes = {}
+
+    def _peer_indexes_current(self) -> bool:
         return (
-            Peer(section.head)
-            for section in self.file.sections()
-            if section.kind == "Peer"
+            self._peer_indexes_file is self.file
+            and self._peer_indexes_version == self.file.version
         )
 
+    def _peer_index(self, field: str) -> _PeerIndex:
+        """Our [Peer]s by `field` (one of `_PEER_KEY_FUNCS`). Each index is
+        built by one pass the first time it's used -- so looking peers up by
+        name in a `lazy` file doesn't load them. Our own adds, modifies and
+        removes keep it up to date from then on; any other change to the file
+        (see `File.version`) has it built again.
+        """
+        if not self._peer_indexes_current():
+            self._peer_indexes = {}
+            self._peer_indexes_file = self.file
+            self._peer_indexes_version = self.file.version
+        if (index := self._peer_indexes.get(field)) is None:
+            index = _PeerIndex(
+                _PEER_KEY_FUNCS[field],
+                (section.head for section in self.file.sections("Peer")),
+            )
+            self._peer_indexes[field] = index
+        return index
+
+    def _find_peer(self, field: str, key: str) -> Optional[Peer]:
+        """The first [Peer] whose `field` is `key`."""
+        head = self._peer_index(field).first(key)
+        if head is not None and (
+            head.owner is not self.file
+            or _PEER_KEY_FUNCS[field](Peer(head)) != key
+        ):
+            # Changed behind our back -- start over
+            self.reindex()
+            head = self._peer_index(field).first(key)
+        return None if head is None else Peer(head)
+
     def peer(self, name: Optional[str] = None) -> Optional[Peer]:
         if name is None:
             return first(self.peers())
-        return find(self.peers(), lambda p: p.name == name)
+        return self._find_peer("name", name)
+
+    def peer_with_public_key(self, public_key: str) -> Optional[Peer]:
+        return self._find_peer("public_key", public_key)
+
+    def peer_with_address(self, address: str) -> Optional[Peer]:
+        """The client [Peer] whose (first) `AllowedIPs` is `address`."""
+        return self._find_peer("address", normalize_client_address(address))
+
+    @contextmanager
+    def _changing_peers(self) -> Iterator[Dict[str, _PeerIndex]]:
+        """Around one of our own changes to the file: gives the peer indexes
+        to bring along, and then takes them as up to date with it. If they
+        were already stale there's nothing to bring along -- they're dropped.
+        """
+        if not self._peer_indexes_current():
+            self._peer_indexes = {}
+            self._peer_indexes_file = self.file
+        yield self._peer_indexes
+        self._peer_indexes_version = self.file.version
 
     def add_peer(self, **props) -> Peer:
         self._resolve_peer_preshared_key(None, props)
         peer = Peer.create(**props)
-        self.file.add_section(peer)
+        with self._changing_peers() as indexes:
+            self.file.add_section(peer)
+            for index in indexes.values():
+                index.add(peer.head)
         return peer
 
-    def _process_peer_updates(
+    def _modify_peer(self, peer: Peer, **props) -> None:
+        with self._changing_peers() as indexes:
+            peer.update(**props)
+            for index in indexes.values():
+                index.update(peer.head)
+
+    def _remove_peer(self, peer: Peer) -> None:
+        with self._changing_peers() as indexes:
+            peer.remove()
+            for index in indexes.values():
+                index.discard(peer.head)
+
+    def _plan_peer_updates(
         self,
         updates: Dict[str, Union[None, PropValues]],
-    ) -> List[_PeerUpdateAction]:
-        peers = list(self.peers())
-        peers_by_name = {p.name: p for p in peers if p.name is not None}
-        peers_by_public_key = {
-            p.public_key: p for p in peers if p.public_key is not None
-        }
-
+        matched: Dict[int, PlanAction],
+        client: bool = False,
+    ) -> List[PlanAction]:
+        """Match `updates` up with our [Peer]s by name (or public key).
+        `matched` has the actions already planned for existing peers, by
+        `id` of the peer's head; a peer matched twice is an error.
+        """
         actions = []
 
-        def add_action(name, type_, peer):
-            for action in actions:
-                if action.peer is not None and action.peer is peer:
-                    raise Exception(
-                        f"Existing peer matched for both {action.name} "
-                        + f"({action.type}) and {name} ({type_}) updates:"
+        def add_action(name, type_, peer, update=None):
+            if update is not None:
+                self._check_update(name, type_, peer, update, client)
+            action = PlanAction(
+                name,
+                type_,
+                peer,
+                update,
+                self._plan_changes(type_, peer, update, client),
+            )
+            if peer is not None:
+                if (other := matched.get(id(peer.head))) is not None:
+                    raise ValueError(
+                        f"Existing peer matched for both {other.name} "
+                        + f"({other.type}) and {name} ({type_}) updates:"
                         + f"\n\n{peer}"
                     )
-            actions.append(_PeerUpdateAction(name, type_, peer))
+                matched[id(peer.head)] = action
+            actions.append(action)
 
         for name, update in updates.items():
-            peer = peers_by_name.get(name)
+            peer = self.peer(name)
 
             if update is None:
                 if peer is not None:
                     add_action(name, "remove", peer)
                 continue
 
+            update = dict(update)  # `apply` fills things in
+
             if key := update.get("public_key"):
-                if by_pubkey := peers_by_public_key.get(key):
+                if by_pubkey := self.peer_with_public_key(key):
                     if peer is None:
                         peer = by_pubkey
-                    elif peer is not by_pubkey:
-                        raise Exception(
-                            f"Update {name} matched spearate [Peer] by name "
-                            + "public key.\n\nBy name:\n\n{peer}\n\nBy public "
-                            + "key:\n\n{by_pubkey}"
+                    elif peer.head is not by_pubkey.head:
+                        raise ValueError(
+                            f"Update {name} matched separate [Peer]s by name "
+                            + f"and public key.\n\nBy name:\n\n{peer}\n\nBy "
+                            + f"public key:\n\n{by_pubkey}"
                         )
 
             if peer is None:
-                add_action(name, "add", None)
+                add_action(name, "add", None, update)
             else:
-                add_action(name, "modify", peer)
+                add_action(name, "modify", peer, update)
 
         return actions
 
+    def _check_update(
+        self,
+        name: str,
+        type_: str,
+        peer: Optional[Peer],
+        update: PropValues,
+        client: bool,
+    ) -> None:
+        """Raise the error carrying out an add or modify would, so that a bad
+        update fails the plan rather than `apply` half way through.
+        """
+        if type_ == "add":
+            # Missing or unknown props
+            create = self.add_client if client else Peer.create
+            signature(create).bind(name=name, **update)
+        props = dict(update)
+        if isinstance(props.get("preshared_key"), bool):
+            del props["preshared_key"]  # Generate, keep or drop one
+        if client:
+            Peer.check_props(**self._client_peer_props(props))
+            # ...and what goes in the client's own config
+            Peer.check_props(
+                **pick(props, ("allowed_ips", "persistent_keepalive"))
+            )
+            Interface.check_props(**pick(props, ("dns", "private_key")))
+            self._check_client_keys(name, props)
+            if (
+                type_ == "modify"
+                and not peer.allowed_ips
+                and not props.get("private_address")
+                and (
+                    "private_key" in props
+                    or self._plan_changes(type_, peer, update, client)
+                )
+            ):
+                raise ValueError(
+                    f"Client {name} has no address to put in its config"
+                )
+        else:
+            Peer.check_props(**props)
+
+    def _check_client_keys(self, name: str, props: PropValues) -> None:
+        """A client's `private_key` must be a key, and `public_key` (if also
+        given) the one that goes with it.
+        """
+        if (private_key := props.get("private_key")) is None:
+            return
+        public_key = props.get("public_key")
+        if public_key is not None and self.pubkey(private_key) != public_key:
+            raise ValueError(
+                f"Client {name} given both public and private keys, but "
+                + "they don't match"
+            )
+
+    def _plan_changes(
+        self,
+        type_: str,
+        peer: Optional[Peer],
+        update: Optional[PropValues],
+        client: bool,
+    ) -> bool:
+        """Would the action change the file? Answered without generating
+        any keys.
+        """
+        if type_ != "modify":
+            return True
+        if client:
+            props = self._client_peer_props(update)
+            if "private_key" in update:
+                props["public_key"] = self.pubkey(update["private_key"])
+        else:
+            props = dict(update)
+        if props.get("preshared_key") is True:
+            if peer.preshared_key is None:
+                return True
+            props["preshared_key"] = peer.preshared_key
+        elif props.get("preshared_key") is False:
+            props["preshared_key"] = None
+        return peer.has_changes(**props)
+
+    def _check_client_addresses(
+        self,
+        actions: List[PlanAction],
+        matched: Dict[int, PlanAction],
+    ) -> None:
+        """No two clients may end up with the same `private_address`."""
+        claimed: Dict[str, str] = {}
+        for action in actions:
+            if action.type == "remove" or (
+                "private_address" not in action.update
+            ):
+                continue
+            address = normalize_client_address(
+                action.update["private_address"]
+            )
+            if address in claimed:
+                raise ValueError(
+                    f"Clients {claimed[address]} and {action.name} both "
+                    + f"given address {address}"
+                )
+            claimed[address] = action.name
+
+            holder = self.peer_with_address(address)
+            if holder is None or (
+                action.peer is not None and holder.head is action.peer.head
+            ):
+                continue
+            # Fine if the holder is being removed or moved elsewhere
+            if (other := matched.get(id(holder.head))) is None or not (
+                other.type == "remove"
+                or "private_address" in other.update
+                or "allowed_ips" in other.update
+            ):
+                raise ValueError(
+                    f"Client {action.name} given address {address}, which "
+                    + f"[Peer] {holder.name} already has"
+                )
+
+    def plan(
+        self,
+        interface: Optional[PropValues] = None,
+        peers: Optional[Dict[str, Optional[PropValues]]] = None,
+        clients: Optional[Dict[str, Optional[PropValues]]] = None,
+    ) -> ConfigPlan:
+        """Work out everything `update` would do -- matching updates to
+        [Peer]s, checking their props and for conflicts between them -- in
+        one pass over the updates, without changing anything or generating
+        keys. The `changed` of what comes back answers "would this change
+        anything?" (a dry run); `apply` carries it out.
+
+        A name in both `peers` and `clients` is a `ValueError`; it used to
+        mean applying the one update, then the other.
+        """
+        matched: Dict[int, PlanAction] = {}
+        if peers and clients and (both := set(peers) & set(clients)):
+            raise ValueError(
+                "Updates for both peers and clients: " + ", ".join(sorted(both))
+            )
+        peer_actions = self._plan_peer_updates(peers or {}, matched)
+        client_actions = self._plan_peer_updates(
+            clients or {}, matched, client=True
+        )
+        self._check_client_addresses(client_actions, matched)
+
+        current = self.interface
+        if any(action.type == "add" for action in client_actions) and (
+            current is None and interface is None
+        ):
+            raise ValueError("No Interface - add one before adding clients")
+
+        return ConfigPlan(
+            self,
+            self.file,
+            self.file.version,
+            None if interface is None else dict(interface),
+            interface is not None
+            and (current is None or current.has_changes(**interface)),
+            peer_actions,
+            client_actions,
+        )
+
+    def apply(self, plan: ConfigPlan) -> Dict[str, Config]:
+        """Carry out a `plan` (from this `Config`, with nothing changed in
+        between -- which also means each plan goes once). Every key the
+        clients need is generated before the first change is made. Returns
+        the configs of the clients added or changed, like `update_clients`.
+        """
+        if plan.config is not self:
+            raise ValueError("Plan is for a different Config")
+        if plan.file is not self.file or plan.version != self.file.version:
+            raise ValueError(
+                "Plan is out of date: the file has changed since it was made "
+                + "(or the plan was applied already)"
+            )
+
+        needs_keys = [
+            action.name
+            for action in plan.clients
+            if self._client_needs_keys(action)
+        ]
+        key_sets = self._client_key_sets(needs_keys)
+        for action in plan.peers:
+            if self._peer_needs_psk(action):
+                action.update["preshared_key"] = self.keys.genpsk()
+
+        if plan.interface is not None:
+            self.update_interface(**plan.interface)
+
+        for action in plan.peers:
+            if action.type == "add":
+                self.add_peer(name=action.name, **action.update)
+            elif action.type == "modify":
+                self._resolve_peer_preshared_key(action.peer, action.update)
+                self._modify_peer(action.peer, **action.update)
+            else:
+                assert action.type == "remove"
+                self._remove_peer(action.peer)
+
+        client_configs = {}
+        with (
+            nullcontext() if self.keystore is None else self.keystore.batch()
+        ):
+            for action in plan.clients:
+                config = None
+                key_set = key_sets.get(action.name)
+                if action.type == "add":
+                    config = self.add_client(
+                        name=action.name, key_set=key_set, **action.update
+                    )
+                elif action.type == "modify":
+                    config = self._modify_client(
+                        action.peer, action.update, key_set
+                    )
+                elif action.type == "remove":
+                    self._remove_peer(action.peer)
+                    if self.keystore is not None:
+                        self.keystore.delete(action.name)
+                if config is not None:
+                    client_configs[action.name] = config
+
+        return client_configs
+
     def _resolve_peer_preshared_key(
         self,
         peer: Optional[Peer],
         update: Dict,
+        key_set: Optional[KeySet] = None,
     ) -> None:
         """Take care of weird bool values that indicate to generate a psk"""
         if "preshared_key" in update:
             if update["preshared_key"] is True:
                 if peer is None or peer.preshared_key is None:
-                    update["preshared_key"] = genpsk(self.wg_bin_path)
+                    if key_set is not None and key_set.preshared_key:
+                        update["preshared_key"] = key_set.preshared_key
+                    else:
+                        update["preshared_key"] = self.keys.genpsk()
                 else:
                     update["preshared_key"] = peer.preshared_key
             elif update["preshared_key"] is False:
                 update["preshared_key"] = None
 
     def update_peers(self, updates: Dict[str, Union[None, PropValues]]) -> None:
-        for action in self._process_peer_updates(updates):
-            if action.type == "add":
-                self.add_peer(name=action.name, **updates[action.name])
-            elif action.type == "modify":
-                update = updates[action.name]
-                self._resolve_peer_preshared_key(action.peer, update)
-                action.peer.update(**update)
-            else:
-                assert action.type == "remove"
-                action.peer.remove()
+        self.apply(self.plan(peers=updates))
 
     def update(
         self,
@@ -268,22 +765,75 @@ class Config:
         peers: Optional[Dict[str, PropValues]] = None,
         clients: Optional[Dict[str, PropValues]] = None,
     ) -> None:
-        if interface is not None:
-            self.update_interface(**interface)
-        if peers is not None and len(peers) > 0:
-            self.update_peers(peers)
-        if clients is not None and len(clients) > 0:
-            self.update_clients(clients)
+        """Update the interface, peers and clients in one go. Nothing changes
+        unless `plan` accepts the lot (so, for one, no name may be in both
+        `peers` and `clients`).
+        """
+        self.apply(self.plan(interface=interface, peers=peers, clients=clients))
+
+    def _client_key_set(self, name: Optional[str]) -> Optional[KeySet]:
+        """Keys we already have for client `name`: those in the `keystore`,
+        or else those derived from `master_secret` (if either is set).
+        """
+        if name is None:
+            return None
+        if self.keystore is not None:
+            if key_set := self.keystore.get(name):
+                return key_set
+        if self.master_secret is not None:
+            return derive_key_set(self.master_secret, name)
+        return None
+
+    def _client_key_sets(self, names: List[str]) -> Dict[str, KeySet]:
+        key_sets = {}
+        missing = []
+        for name in names:
+            if key_set := self._client_key_set(name):
+                key_sets[name] = key_set
+            else:
+                missing.append(name)
+        if missing:
+            key_sets.update(zip(missing, self.keys.genkeys(len(missing))))
+        for name, key_set in key_sets.items():
+            if key_set.preshared_key is None:
+                # Stored without one, but one may be wanted now
+                key_sets[name] = key_set._replace(
+                    preshared_key=self.keys.genpsk()
+                )
+        return key_sets
+
+    def _store_client_keys(
+        self,
+        name: Optional[str],
+        private_key: str,
+        public_key: str,
+        preshared_key: Optional[str],
+    ) -> None:
+        if self.keystore is not None and name is not None:
+            self.keystore.put(
+                name, KeySet(private_key, public_key, preshared_key)
+            )
+
+    def _client_private_key(self, peer: Peer) -> Optional[str]:
+        """The private key for a client [Peer], if we can recover it."""
+        if key_set := self._client_key_set(peer.name):
+            if key_set.public_key == peer.public_key:
+                return key_set.private_key
+        return None
 
     def _resolve_client_keys(
         self,
         private_key: Optional[str],
         public_key: Optional[str],
+        key_set: Optional[KeySet] = None,
     ) -> Tuple[Optional[str], Optional[str]]:
+        if private_key is None and public_key is None and key_set is not None:
+            return (key_set.private_key, key_set.public_key)
+
         if (
             private_key is not None
             and public_key is not None
-            and pubkey(private_key, self.wg_bin_path) != public_key
+            and self.pubkey(private_key) != public_key
         ):
             raise ValueError(
                 "Both public and private keys provided, but don't match"
@@ -291,9 +841,9 @@ class Config:
 
         if public_key is None:
             if private_key is None:
-                private_key = genkey(self.wg_bin_path)
+                private_key = self.keys.genkey()
 
-            public_key = pubkey(private_key, self.wg_bin_path)
+            public_key = self.pubkey(private_key)
 
         return (private_key, public_key)
 
@@ -308,26 +858,40 @@ class Config:
         persistent_keepalive: Peer.persistent_keepalive.type = None,
         private_key: Optional[Interface.private_key.type] = None,
         public_key: Optional[Peer.public_key.type] = None,
+        key_set: Optional[KeySet] = None,
     ) -> Optional[Config]:
+        """Add a [Peer] for a client, returning the client's own Config if we
+        have (or generated) its private key.
+
+        `key_set` supplies pre-generated keys (see `KeyBackend.genkeys`) to use
+        in place of generating them here. When `master_secret` is set, keys
+        are derived from it and `name` instead.
+        """
         interface = self.interface
 
         if interface is None:
             raise Exception("No Interface - add one before adding clients")
 
+        if key_set is None:
+            key_set = self._client_key_set(name)
+
         private_key, public_key = self._resolve_client_keys(
-            private_key, public_key
+            private_key, public_key, key_set
         )
 
         if public_key is None:
             if private_key is None:
-                private_key = genkey(self.wg_bin_path)
+                private_key = self.keys.genkey()
 
-            public_key = pubkey(private_key, self.wg_bin_path)
+            public_key = self.pubkey(private_key)
 
         if preshared_key is False:
             preshared_key = None
         elif preshared_key is True:
-            preshared_key = genpsk(self.wg_bin_path)
+            if key_set is not None and key_set.preshared_key:
+                preshared_key = key_set.preshared_key
+            else:
+                preshared_key = self.keys.genpsk()
 
         private_address = normalize_client_address(private_address)
 
@@ -343,6 +907,8 @@ class Config:
         if private_key is None:
             return None  # Can't make the config
 
+        self._store_client_keys(name, private_key, public_key, preshared_key)
+
         return self._make_client_config(
             name=name,
             private_address=private_address,
@@ -353,6 +919,34 @@ class Config:
             private_key=private_key,
         )
 
+    def client_config(
+        self,
+        name: str,
+        allowed_ips: Optional[Peer.allowed_ips.type] = None,
+        dns: Interface.dns.type = None,
+        persistent_keepalive: Peer.persistent_keepalive.type = None,
+    ) -> Optional[Config]:
+        """Rebuild the config for client `name` without touching its [Peer].
+
+        Only possible when we can recover the client's private key (from the
+        `keystore` or `master_secret`); returns `None` otherwise.
+        """
+        peer = self.peer(name)
+        if peer is None:
+            raise KeyError(f"No [Peer] named {name!r}")
+        private_key = self._client_private_key(peer)
+        if private_key is None:
+            return None
+        return self._make_client_config(
+            name=name,
+            private_address=peer.allowed_ips[0],
+            private_key=private_key,
+            allowed_ips=allowed_ips,
+            preshared_key=peer.preshared_key,
+            dns=dns,
+            persistent_keepalive=persistent_keepalive,
+        )
+
     def _make_client_config(
         self,
         name: str,
@@ -370,7 +964,7 @@ class Config:
             hostname=name,
             name=None,
             dir=None,
-            wg_bin_path=self.wg_bin_path,
+            keys=self.keys,
         )
         client_config.create_interface(
             private_key=private_key,
@@ -387,21 +981,12 @@ class Config:
             endpoint=self.get_public_endpoint(),
             persistent_keepalive=persistent_keepalive,
             preshared_key=preshared_key,
-            # TODO Performance... shelling out more than needed props
-            public_key=pubkey(self.interface.private_key, self.wg_bin_path),
+            public_key=self.public_key,
         )
         return client_config
 
-    def _modify_client(self, peer, update) -> Optional[Config]:
-        if "private_key" in update:
-            public_key = pubkey(update["private_key"], self.wg_bin_path)
-            if "public_key" in update:
-                assert public_key == update["public_key"]
-            else:
-                update["public_key"] = public_key
-
-        self._resolve_peer_preshared_key(peer, update)
-
+    @staticmethod
+    def _client_peer_props(update: PropValues) -> Dict[str, PropValue]:
         peer_props = pick(update, _SERVER_SIDE_PEER_UPDATE_KEYS)
 
         if "private_address" in update:
@@ -409,21 +994,76 @@ class Config:
                 update["private_address"]
             )
 
+        return peer_props
+
+    def _client_needs_keys(self, action: PlanAction) -> bool:
+        """Will applying `action` generate a keypair or preshared key?
+
+        Answers without generating (or deriving) anything, so that `apply`
+        can generate everything the batch needs up front.
+        """
+        update = action.update
+        if action.type == "add":
+            return (
+                update.get("private_key") is None
+                and update.get("public_key") is None
+            ) or update.get("preshared_key", True) is True
+
+        return action.type == "modify" and (
+            ("private_key" not in update and action.changed)
+            or (
+                update.get("preshared_key") is True
+                and action.peer.preshared_key is None
+            )
+        )
+
+    @staticmethod
+    def _peer_needs_psk(action: PlanAction) -> bool:
+        """Will applying (non-client) `action` generate a preshared key?"""
+        return (
+            action.type != "remove"
+            and action.update.get("preshared_key") is True
+            and (action.peer is None or action.peer.preshared_key is None)
+        )
+
+    def _modify_client(
+        self,
+        peer: Peer,
+        update: PropValues,
+        key_set: Optional[KeySet] = None,
+    ) -> Optional[Config]:
+        if key_set is None:
+            key_set = self._client_key_set(peer.name)
+
+        if "private_key" in update:
+            # `plan` checked that any `public_key` given goes with it
+            update["public_key"] = self.pubkey(update["private_key"])
+
+        self._resolve_peer_preshared_key(peer, update, key_set)
+
+        peer_props = self._client_peer_props(update)
+
         if not peer.has_changes(**peer_props):
             if "private_key" not in update:
                 # No changes, no private key, so no config for you
                 return None
             # No changes, but can still make the config, since we have a private
             # key to use
+            self._store_client_keys(
+                peer.name,
+                update["private_key"],
+                peer.public_key,
+                peer.preshared_key,
+            )
             return self._make_client_config(
                 name=peer.name,
                 private_address=peer.allowed_ips[0],
+                preshared_key=peer.preshared_key,
                 **pick(
                     update,
                     (
                         "private_key",
                         "allowed_ips",
-                        "preshared_key",
                         "dns",
                         "persistent_keepalive",
                     ),
@@ -434,42 +1074,32 @@ class Config:
         # generate new ones
         if "private_key" in update:
             private_key = update["private_key"]
+        elif key_set is not None:
+            private_key = key_set.private_key
+            peer_props["public_key"] = key_set.public_key
         else:
-            private_key = genkey(self.wg_bin_path)
-            peer_props["public_key"] = pubkey(private_key, self.wg_bin_path)
+            private_key = self.keys.genkey()
+            peer_props["public_key"] = self.pubkey(private_key)
 
-        peer.update(**peer_props)
+        self._modify_peer(peer, **peer_props)
+
+        self._store_client_keys(
+            peer.name, private_key, peer.public_key, peer.preshared_key
+        )
 
         return self._make_client_config(
             name=peer.name,
             private_address=peer.allowed_ips[0],
             private_key=private_key,
-            **pick(
-                update,
-                ("allowed_ips", "preshared_key", "dns", "persistent_keepalive"),
-            ),
+            preshared_key=peer.preshared_key,
+            **pick(update, ("allowed_ips", "dns", "persistent_keepalive")),
         )
 
     def update_clients(
         self,
         updates: Dict[Section.name.type, Optional[PropValues]],
     ) -> Dict[str, Config]:
-        client_configs = {}
-        actions = self._process_peer_updates(updates)
-
-        for action in actions:
-            config = None
-            update = updates.get(action.name)
-            if action.type == "add":
-                config = self.add_client(name=action.name, **update)
-            elif action.type == "modify":
-                config = self._modify_client(action.peer, update)
-            elif action.type == "remove":
-                action.peer.remove()
-            if config is not None:
-                client_configs[action.name] = config
-
-        return client_configs
+        return self.apply(self.plan(clients=updates))
 
     def __str__(self) -> str:
         return str(self.file)
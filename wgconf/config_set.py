@@ -0,0 +1,187 @@
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+import os
+
+from .config import Config
+from .file import File
+from .parse_cache import decode_lines, encode_lines
+from .section import DUP_TYPE, DEFAULT_DUP
+
+
+def _parse_encoded(path: Path, dup: DUP_TYPE) -> Tuple[bytes, List[str]]:
+    # Runs in a helper process. A linked `File` doesn't pickle well (it
+    # recurses down the whole list), so ship back the flat form instead
+    return encode_lines(File(path, dup=dup).lines())
+
+
+class ConfigSet:
+    """All the interfaces in a directory, one `Config` per `*.conf`.
+
+    `load_dir` parses the files in parallel on a pool of threads.
+
+    Lookups across every interface (`configs_with_public_key`,
+    `configs_with_client`) use indexes built on first use, and built again
+    once any of the files has changed (see `File.version`).
+    """
+
+    configs: Dict[str, Config]
+
+    def __init__(self, configs: Iterable[Config] = ()):
+        self.configs = {config.name: config for config in configs}
+        self._by_public_key: Optional[Dict[str, List[Config]]] = None
+        self._by_client_name: Optional[Dict[str, List[Config]]] = None
+        self._indexed: List[Tuple[Config, File, int]] = []
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({sorted(self.configs)!r})"
+
+    def __getitem__(self, name: str) -> Config:
+        return self.configs[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.configs
+
+    def __iter__(self) -> Iterator[Config]:
+        return iter(self.configs.values())
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+    # pylint: disable=redefined-builtin
+    @classmethod
+    def load_dir(
+        cls,
+        hostname: str,
+        dir: Union[Path, str] = Config.DEFAULT_DIR,
+        workers: Optional[int] = None,
+        processes: bool = False,
+        dup: DUP_TYPE = DEFAULT_DUP,
+        **config_kwds,
+    ) -> ConfigSet:
+        """Load every `*.conf` in `dir`, `workers` at a time (by default, as
+        many as there are cores). With a single worker there's no pool at all.
+
+        With `processes`, files are tokenized in spawned helper processes
+        instead of on threads. That doesn't make loading faster: the helpers
+        only take the tokenizing off this process, which still builds every
+        `Line` itself, one file at a time (about a third of the work of a
+        full parse). `lazy` and `parse_cache` (passed through, like the rest
+        of `config_kwds`, to each `Config`) need threads.
+        """
+        dir = Path(dir)
+        paths = sorted(dir.glob("*.conf"))
+
+        if processes and (
+            config_kwds.get("lazy") or config_kwds.get("parse_cache")
+        ):
+            raise ValueError(
+                "`lazy` and `parse_cache` only work with `processes=False`"
+            )
+        if workers is None:
+            workers = min(len(paths), os.cpu_count() or 1)
+
+        lazy = config_kwds.get("lazy", False)
+        parse_cache = config_kwds.get("parse_cache")
+
+        def load(path: Path) -> File:
+            return File(path, dup=dup, lazy=lazy, parse_cache=parse_cache)
+
+        if workers <= 1:
+            # A pool would only add overhead
+            files = [load(path) for path in paths]
+        elif processes:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=get_context("spawn")
+            ) as executor:
+                futures = [
+                    executor.submit(_parse_encoded, path, dup)
+                    for path in paths
+                ]
+                files = [
+                    File.from_lines(
+                        decode_lines(*future.result()), dup=dup, path=path
+                    )
+                    for path, future in zip(paths, futures)
+                ]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                files = list(executor.map(load, paths))
+
+        return cls(
+            Config(
+                hostname=hostname,
+                name=path.stem,
+                dir=dir,
+                file=file,
+                **config_kwds,
+            )
+            for path, file in zip(paths, files)
+        )
+
+    def reindex(self) -> None:
+        self._by_public_key = None
+        self._by_client_name = None
+
+    def _indexes_current(self) -> bool:
+        """Were the indexes built from the configs and files as they are
+        now?
+        """
+        return (
+            self._by_public_key is not None
+            and len(self._indexed) == len(self.configs)
+            and all(
+                self.configs.get(config.name) is config
+                and config.file is file
+                and config.file.version == version
+                for config, file, version in self._indexed
+            )
+        )
+
+    def _build_indexes(self) -> None:
+        by_public_key: Dict[str, List[Config]] = {}
+        by_client_name: Dict[str, List[Config]] = {}
+
+        def add(index: Dict[str, List[Config]], key: str, config: Config):
+            configs = index.setdefault(key, [])
+            if not configs or configs[-1] is not config:
+                configs.append(config)
+
+        for config in self.configs.values():
+            for peer in config.peers():
+                if (public_key := peer.public_key) is not None:
+                    add(by_public_key, public_key, config)
+                if (name := peer.name) is not None:
+                    add(by_client_name, name, config)
+        self._by_public_key = by_public_key
+        self._by_client_name = by_client_name
+        self._indexed = [
+            (config, config.file, config.file.version)
+            for config in self.configs.values()
+        ]
+
+    def configs_with_public_key(self, public_key: str) -> List[Config]:
+        """Interfaces with a [Peer] whose `PublicKey` is `public_key`."""
+        if not self._indexes_current():
+            self._build_indexes()
+        return list(self._by_public_key.get(public_key, ()))
+
+    def configs_with_client(self, name: str) -> List[Config]:
+        """Interfaces with a [Peer] (client) named `name`."""
+        if not self._indexes_current():
+            self._build_indexes()
+        return list(self._by_client_name.get(name, ()))
+
+    def owner_of_public_key(self, public_key: str) -> Optional[Config]:
+        """The interface with a [Peer] for `public_key`, if exactly one has
+        one. Raises if several do.
+        """
+        configs = self.configs_with_public_key(public_key)
+        if len(configs) > 1:
+            raise Exception(
+                f"Public key {public_key} is on several interfaces: "
+                + ", ".join(config.name for config in configs)
+            )
+        return configs[0] if configs else None
@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Dict, Iterable, Optional, TextIO
 from pathlib import Path
+from itertools import count
+import re
 
 from typeguard import check_type
 
@@ -8,23 +10,67 @@ from .util import *
 from .line import (
     Line,
     Blank,
-    Comment,
-    Option,
     SectionHead,
     DefaultSectionHead,
+    LazySectionHead,
+    parse_line,
+    index_section,
 )
 from .section import Section, DUP_TYPE, DEFAULT_DUP
+from .parse_cache import ParseCache
+from .snapshot import Snapshot, SnapshotSectionHead, freeze
+
+# What the lazy loader's scan looks for: section heads, and the `Name` meta
+# comment in each section. Same shapes `parse_line` / `meta_for` accept, kept
+# to a single line.
+_LAZY_HEAD_REGEXP = re.compile(r"\[([A-Za-z]+)\][^\S\n]*(?:\n|\Z)")
+_LAZY_NAME_REGEXP = re.compile(
+    r"^#\ ?Name[^\S\n]*=[^\S\n]*([^\n]+?)\r?$", re.MULTILINE
+)
+
+
+def _lazy_head_matches(source: str) -> Iterator[re.Match]:
+    if match := _LAZY_HEAD_REGEXP.match(source):
+        yield match
+    position = source.find("\n[")
+    while position != -1:
+        if match := _LAZY_HEAD_REGEXP.match(source, position + 1):
+            yield match
+        position = source.find("\n[", position + 1)
 
 class File:
     path: Optional[Path]
     _default_section_head: DefaultSectionHead
+    _heads: Optional[Dict[int, SectionHead]]
+    _heads_by_kind: Optional[Dict[str, Dict[int, SectionHead]]]
+    _slots: Optional[Dict[int, int]]
+    _slot_numbers: Optional[Iterator[int]]
+    _tail: Optional[Line]
+    _tail_head: Optional[Line]
+    _snapshot: Optional[Snapshot]
     dup: DUP_TYPE
+    # Goes up with every change the section index sees (see `_index`), so
+    # anything worked out from the file can tell when it's gone stale
+    version: int
 
     def __init__(
         self,
         path: Optional[Union[Path, str]] = None,
         dup: DUP_TYPE = DEFAULT_DUP,
+        lazy: bool = False,
+        parse_cache: Optional[ParseCache] = None,
     ):
+        """Load from `path` (if it exists), or start empty.
+
+        With `lazy`, only the default section is parsed up front; every other
+        section is found by a quick scan and parsed the first time something
+        looks inside it (see `LazySectionHead`). Bad lines in a section are
+        then reported when it's loaded rather than here.
+
+        With a `parse_cache` (and not `lazy`), lines are taken from the cache
+        when `path` hasn't changed since it was last parsed, and the cache is
+        refreshed when it has.
+        """
         check_type("Bad `dup` value", dup, DUP_TYPE)
 
         if path is not None and not isinstance(path, Path):
@@ -33,30 +79,165 @@ class File:
         self.path = path
 
         self._default_section_head = DefaultSectionHead()
+        self._default_section_head.owner = self
+        self._heads = None
+        self._heads_by_kind = None
+        self._slots = None
+        self._slot_numbers = None
+        self._tail = None
+        self._tail_head = None
+        self._snapshot = None
+        self.version = 0
 
         self.dup = dup
 
         if self.path is not None and self.path.exists():
-            self.__init_load()
+            if lazy:
+                self._load_lazy(self.path.read_text(), self.path)
+            elif parse_cache is not None:
+                self._load_cached(parse_cache)
+            else:
+                with open(self.path) as fp:
+                    self._load(fp, self.path)
+
+    @classmethod
+    def from_stream(
+        cls,
+        strings: Iterable[str],
+        dup: DUP_TYPE = DEFAULT_DUP,
+        path: Optional[Union[Path, str]] = None,
+    ) -> File:
+        """Parse a File from any iterable of lines, as they arrive.
+
+        Lines may or may not end in newlines. Nothing is read from `path`;
+        it's only recorded so the File can be written back there.
+        """
+        file = cls(dup=dup)
+        if path is not None:
+            file.path = path if isinstance(path, Path) else Path(path)
+        file._load(strings, "<stream>" if path is None else path)
+        return file
+
+    @classmethod
+    def from_string(
+        cls,
+        string: str,
+        dup: DUP_TYPE = DEFAULT_DUP,
+        path: Optional[Union[Path, str]] = None,
+    ) -> File:
+        """Parse a File from config text already in memory.
+
+        Lines are sliced out one at a time as they're parsed; the text is
+        never split or copied as a whole.
+        """
+        return cls._from_lines_of(string, dup, path, "<string>")
+
+    @classmethod
+    def from_bytes(
+        cls,
+        data: Union[bytes, bytearray, memoryview],
+        dup: DUP_TYPE = DEFAULT_DUP,
+        path: Optional[Union[Path, str]] = None,
+        encoding: str = "utf_8",
+    ) -> File:
+        """Like `from_string`, for encoded text. Each line is decoded straight
+        from `data`, so a `memoryview` over a bigger buffer works without
+        copying it.
+        """
+        return cls._from_lines_of(data, dup, path, "<bytes>", encoding)
 
-    def __init_load(self):
-        with open(self.path) as fp:
-            strings = fp.read().splitlines()
+    @classmethod
+    def _from_lines_of(
+        cls,
+        source: Union[str, bytes, bytearray, memoryview],
+        dup: DUP_TYPE,
+        path: Optional[Union[Path, str]],
+        name: str,
+        encoding: str = "utf_8",
+    ) -> File:
+        file = cls(dup=dup)
+        if path is not None:
+            file.path = path if isinstance(path, Path) else Path(path)
+        file._load(
+            iter_lines(source, encoding=encoding),
+            name if path is None else path,
+        )
+        return file
 
+    @classmethod
+    def from_lines(
+        cls,
+        lines: Iterable[Line],
+        dup: DUP_TYPE = DEFAULT_DUP,
+        path: Optional[Union[Path, str]] = None,
+    ) -> File:
+        """Make a File out of already-parsed, not yet linked lines."""
+        file = cls(dup=dup)
+        if path is not None:
+            file.path = path if isinstance(path, Path) else Path(path)
+        file._link(lines)
+        return file
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot: Snapshot,
+        path: Optional[Union[Path, str]] = None,
+    ) -> File:
+        """A new File with `snapshot`'s contents, to change as you please.
+        Sections are only parsed when something looks inside them, and stay
+        shared with `snapshot` (and its `diff`) until they're changed.
+        """
+        file = cls(dup=snapshot.dup)
+        if path is not None:
+            file.path = path if isinstance(path, Path) else Path(path)
+
+        default, *sections = snapshot.sections
+        tail = file._load(default.lines, "<snapshot>")
+        file._default_section_head.frozen = default
+        index_section(file._default_section_head)
+
+        for section in sections:
+            head = SnapshotSectionHead(section)
+            tail.next = head
+            head.prev = tail
+            tail = head
+
+        file._index()
+        file._snapshot = snapshot
+        return file
+
+    @classmethod
+    def from_fp(
+        cls,
+        fp: TextIO,
+        dup: DUP_TYPE = DEFAULT_DUP,
+        path: Optional[Union[Path, str]] = None,
+    ) -> File:
+        """Parse a File from an open text stream -- a file, pipe, `wg showconf`
+        output, `io.StringIO`... -- reading it line by line.
+        """
+        if path is None and isinstance(getattr(fp, "name", None), str):
+            source = fp.name
+        else:
+            source = path
+        file = cls(dup=dup)
+        if path is not None:
+            file.path = path if isinstance(path, Path) else Path(path)
+        file._load(fp, "<stream>" if source is None else source)
+        return file
+
+    def _load(self, strings: Iterable[str], source) -> Line:
         tail = self._default_section_head
 
         for index, string in enumerate(strings):
             line_num = index + 1
 
-            # pylint: disable=cell-var-from-loop
-            line = find_map(
-                (Blank, Comment, SectionHead, Option),
-                lambda c: c.from_string(string)
-            )
+            line = parse_line(string.rstrip("\r\n"))
 
             if line is None:
                 raise Exception(
-                    f"{self.path}:{line_num} Bad line: {string}"
+                    f"{source}:{line_num} Bad line: {string.rstrip()}"
                 )
 
             tail.next = line
@@ -64,10 +245,79 @@ class File:
 
             tail = line
 
+        return tail
+
+    def _link(self, lines: Iterable[Line]) -> None:
+        tail = self._default_section_head
+        for line in lines:
+            tail.next = line
+            line.prev = tail
+            tail = line
+
+    def _load_cached(self, cache: ParseCache) -> None:
+        data = self.path.read_bytes()
+        key = cache.key(self.path, data)
+        if (lines := cache.get(self.path, key)) is not None:
+            self._link(lines)
+            return
+        self._load(iter_lines(data), self.path)
+        cache.put(self.path, key, self.lines())
+
+    def _load_lazy(self, source: str, origin) -> None:
+        matches = list(_lazy_head_matches(source))
+
+        if not matches:
+            self._load(iter_lines(source), origin)
+            return
+
+        tail = self._load(iter_lines(source, 0, matches[0].start()), origin)
+
+        for index, match in enumerate(matches):
+            if index + 1 < len(matches):
+                end = matches[index + 1].start()
+            else:
+                end = len(source)
+            name_match = _LAZY_NAME_REGEXP.search(source, match.end(), end)
+            head = LazySectionHead(
+                match.group(1),
+                source,
+                match.end(),
+                end,
+                origin,
+                None if name_match is None else name_match.group(1),
+            )
+            tail.next = head
+            head.prev = tail
+            tail = head
+
     @property
     def first_line(self) -> Optional[Line]:
         return self._default_section_head.next
 
+    @property
+    def last_line(self) -> Optional[Line]:
+        """Found from the last line we saw there, or else the last section's
+        head, rather than by walking the whole file. Which is which gets
+        re-checked each time: the remembered line must still be linked in
+        (`Line.remove` unlinks both ways) and still be in the last section.
+        """
+        self._index()
+        last_head = next(
+            reversed(self._heads.values()), self._default_section_head
+        )
+        line = self._tail
+        if (
+            line is None
+            or line.prev is None
+            or self._tail_head is not last_head
+        ):
+            line = last_head
+        while line.next is not None:
+            line = line.next
+        self._tail = line
+        self._tail_head = last_head
+        return None if line is self._default_section_head else line
+
     @property
     def is_empty(self) -> bool:
         return self.first_line is None
@@ -82,35 +332,175 @@ class File:
             yield line
             line = line.next
 
-    def sections(self) -> Iterator[Section]:
-        yield self.default_section
-        line = self.first_line
-        while line is not None:
-            if isinstance(line, SectionHead):
-                yield Section(line, dup=self.dup)
-            line = line.next
+    def _index(self) -> Dict[str, Dict[int, SectionHead]]:
+        """Section heads by kind, each kind's in file order. Built by one
+        scan on first use; after that `Section.remove`, `Section.replace`
+        and heads linked in or removed through `Line` methods (which is what
+        `add_section` does) keep it up to date.
+
+        Heads don't hash, so each gets a slot number to be keyed by
+        (`_slots` maps `id(head)` to it). A replacement takes over its
+        predecessor's slot, and with it its place in the order.
+        """
+        if self._heads_by_kind is None:
+            self._heads = {}
+            self._heads_by_kind = {}
+            self._slots = {}
+            self._slot_numbers = count()
+            line = self.first_line
+            while line is not None:
+                if isinstance(line, SectionHead):
+                    self._index_head(line)
+                if isinstance(line, LazySectionHead):
+                    line = line.peek_next()  # Don't load it just to get past
+                else:
+                    line = line.next
+        return self._heads_by_kind
+
+    def _changed(self) -> None:
+        self._snapshot = None
+        self.version += 1
+
+    def _index_head(self, head: SectionHead) -> None:
+        head.owner = self
+        slot = self._slots[id(head)] = next(self._slot_numbers)
+        self._heads[slot] = head
+        self._heads_by_kind.setdefault(head.value, {})[slot] = head
+
+    def _section_removed(self, head: SectionHead) -> None:
+        self._changed()
+        head.owner = None
+        if (slot := self._slots.pop(id(head), None)) is not None:
+            del self._heads[slot]
+            del self._heads_by_kind[head.value][slot]
+
+    def _section_replaced(self, head: SectionHead, new: SectionHead) -> None:
+        self._changed()
+        head.owner = None
+        new.owner = self
+        if (slot := self._slots.pop(id(head), None)) is None:
+            return
+        self._slots[id(new)] = slot
+        self._heads[slot] = new
+        if new.value == head.value:
+            self._heads_by_kind[head.value][slot] = new
+        else:
+            del self._heads_by_kind[head.value][slot]
+            self._collect_kind(new.value)
+
+    def _section_rekinded(self, head: SectionHead, kind: str) -> None:
+        """`head.value` was changed from `kind`."""
+        if (slot := self._slots.get(id(head))) is not None:
+            del self._heads_by_kind[kind][slot]
+            self._collect_kind(head.value)
+
+    def _head_linked(self, head: SectionHead, after: Line) -> None:
+        """`head` was linked in through `Line` methods, splitting the section
+        `after` heads.
+        """
+        self._changed()
+        if self._heads_by_kind is None or id(head) in self._slots:
+            return  # A scan will find it
+        last_head = next(
+            reversed(self._heads.values()), self._default_section_head
+        )
+        if after is last_head:
+            self._index_head(head)
+            return
+        # In the middle: rebuild the order around it (rare, and one pass)
+        head.owner = self
+        slot = self._slots[id(head)] = next(self._slot_numbers)
+        after_slot = self._slots.get(id(after))
+        heads = {} if after_slot is not None else {slot: head}
+        for key, other in self._heads.items():
+            heads[key] = other
+            if key == after_slot:
+                heads[slot] = head
+        self._heads = heads
+        self._collect_kind(head.value)
+
+    def _collect_kind(self, kind: str) -> None:
+        # Where a head goes among those of its kind depends on the heads
+        # around it, so re-collect them (rare, and still one pass)
+        self._heads_by_kind[kind] = {
+            key: other
+            for key, other in self._heads.items()
+            if other.value == kind
+        }
+
+    def sections(self, kind: Optional[str] = None) -> Iterator[Section]:
+        """Every section in order, starting with the default one -- or only
+        the `kind` ones.
+        """
+        if kind is None:
+            yield self.default_section
+            self._index()
+            heads = tuple(self._heads.values())
+        else:
+            heads = tuple(self._index().get(kind, {}).values())
+        for head in heads:
+            yield Section(head, dup=self.dup)
+
+    def section(self, kind: str) -> Optional[Section]:
+        """The first `kind` section, if there is one."""
+        for head in self._index().get(kind, {}).values():
+            return Section(head, dup=self.dup)
+        return None
 
     def add_section(self, section: Section, newline: bool = True):
-        if self.is_empty:
+        if (last_line := self.last_line) is None:
             self._default_section_head.insert_next(section.head)
         else:
-            last_line = last(self.lines())
             if newline and not isinstance(last_line, Blank):
                 last_line.insert_next(Blank())
                 last_line = last_line.next
             last_line.insert_next(section.head)
 
+        # (`insert_next` filed the head in our index)
+
         if newline:
             new_last_line = last(section)
             if not isinstance(new_last_line, Blank):
                 new_last_line.insert_next(Blank())
 
+    def snapshot(self) -> Snapshot:
+        """An immutable copy of the file as it is now.
+
+        Sections that haven't changed since the last snapshot aren't copied
+        again: the new snapshot shares them. If nothing at all has changed,
+        the last snapshot itself comes back. (Changes are seen the same way
+        the section index sees them -- see `_index`.)
+        """
+        if self._snapshot is None:
+            self._index()
+            self._snapshot = Snapshot(
+                (
+                    freeze(self._default_section_head),
+                    *(freeze(head) for head in self._heads.values()),
+                ),
+                self.dup,
+            )
+        return self._snapshot
+
+    def _strings(self) -> Iterator[str]:
+        line = self.first_line
+        while line is not None:
+            yield str(line)
+            if (
+                isinstance(line, LazySectionHead)
+                and (strings := line.peek_strings()) is not None
+            ):
+                yield from strings
+                line = line.peek_next()
+            else:
+                line = line.next
+
     def __str__(self) -> str:
-        return ''.join((f"{line}\n" for line in self.lines()))
+        return ''.join((f"{string}\n" for string in self._strings()))
 
     def __getitem__(self, key: Union[None, str]) -> Union[None, Line, Section]:
         if key is None or key == '':
             return self.default_section
-        if section := find(self.sections(), lambda sect: sect.kind == key):
+        if section := self.section(key):
             return section
         return self.default_section[key]
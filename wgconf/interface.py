@@ -20,6 +20,9 @@ class Interface(Section):
     post_down = Prop("PostDown", Optional[str])
     save_config = Prop("SaveConfig", Optional[bool])
 
+    # Derived from `private_key`; only stored when `Config.store_public_key`
+    public_key = Prop("PublicKey", Optional[str], meta=True)
+
     @classmethod
     def create(
         cls,
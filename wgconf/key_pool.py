@@ -0,0 +1,236 @@
+from __future__ import annotations
+from typing import List, Optional
+from collections import OrderedDict, namedtuple
+from queue import Empty, Queue
+from threading import Event, Lock, Thread, current_thread
+import logging
+
+from .keys import DEFAULT_KEY_BACKEND, KeyBackend, KeySet
+
+KeyPoolStats = namedtuple("KeyPoolStats", "hits misses keypairs psks")
+
+_LOG = logging.getLogger(__name__)
+
+
+class KeyPool(KeyBackend):
+    """A `KeyBackend` that hands out keys from a stock kept topped up by a
+    background thread.
+
+    Wraps another backend (`backend`), which does the actual generating. The
+    pool holds up to `size` keypairs and `size` preshared keys; whenever either
+    stock drops below `low_water` the refill thread is woken to bring it back
+    up to `size`. When a stock is empty we fall back to generating on the
+    caller's thread, which counts as a miss.
+
+    Use it anywhere a backend goes:
+
+        pool = KeyPool(size=256, low_water=64)
+        config = Config(hostname="bounce.example.com", keys=pool)
+
+    The refill thread is a daemon and starts on construction (or on first
+    draw, with `start=False`). After `close()` it stays stopped -- draws just
+    miss -- until `start()` is called again. If the wrapped backend fails
+    while refilling, the error is logged and kept in `error`, and the next
+    draw starts a fresh thread.
+    """
+
+    backend: KeyBackend
+    size: int
+    low_water: int
+
+    def __init__(
+        self,
+        backend: KeyBackend = DEFAULT_KEY_BACKEND,
+        size: int = 64,
+        low_water: Optional[int] = None,
+        start: bool = True,
+    ):
+        if size < 1:
+            raise ValueError(f"`size` must be at least 1, given {size}")
+        if low_water is None:
+            low_water = size // 4
+        if not 0 <= low_water <= size:
+            raise ValueError(
+                f"`low_water` must be between 0 and `size` ({size}), "
+                + f"given {low_water}"
+            )
+
+        self.backend = backend
+        self.size = size
+        self.low_water = low_water
+
+        self._keypairs: Queue = Queue()
+        self._psks: Queue = Queue()
+        # Private keys we handed out -> their public keys, so the `pubkey` call
+        # that usually follows `genkey` doesn't have to derive anything
+        self._issued: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        # Held while topping up, so the thread and `fill` callers can't both
+        # put in what's missing
+        self._fill_lock = Lock()
+        self._error: Optional[BaseException] = None
+        self._hits = 0
+        self._misses = 0
+        self._wake = Event()
+        self._closed = Event()
+        self._thread: Optional[Thread] = None
+
+        if start:
+            self.start()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.backend!r}, size={self.size}, "
+            + f"low_water={self.low_water})"
+        )
+
+    def __enter__(self) -> KeyPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """What stopped the refill thread last, if anything did."""
+        return self._error
+
+    @property
+    def stats(self) -> KeyPoolStats:
+        with self._lock:
+            return KeyPoolStats(
+                self._hits,
+                self._misses,
+                self._keypairs.qsize(),
+                self._psks.qsize(),
+            )
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._closed.clear()
+            self._wake.set()
+            self._thread = Thread(
+                target=self._run, name="wgconf-key-pool", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wake.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def fill(self) -> None:
+        """Top both stocks up to `size` on the calling thread."""
+        with self._fill_lock:
+            if (missing := self.size - self._keypairs.qsize()) > 0:
+                for key_set in self.backend.genkeys(
+                    missing, preshared_keys=False
+                ):
+                    self._keypairs.put(key_set)
+            for _ in range(self.size - self._psks.qsize()):
+                self._psks.put(self.backend.genpsk())
+
+    def _run(self) -> None:
+        try:
+            while not self._closed.is_set():
+                self._wake.wait()
+                self._wake.clear()
+                if self._closed.is_set():
+                    break
+                self.fill()
+        except Exception as error:  # pylint: disable=broad-except
+            _LOG.exception("Key pool refill failed")
+            self._error = error
+        finally:
+            with self._lock:
+                if self._thread is current_thread():
+                    self._thread = None
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+
+    def _drew(self, stock: Queue) -> None:
+        if stock.qsize() < self.low_water and not self._closed.is_set():
+            if self._thread is None:
+                self.start()
+            self._wake.set()
+
+    def _take_keypair(self) -> KeySet:
+        try:
+            key_set = self._keypairs.get_nowait()
+        except Empty:
+            self._count(0, 1)
+            key_set = self.backend.genkeys(1, preshared_keys=False)[0]
+        else:
+            self._count(1, 0)
+        self._drew(self._keypairs)
+        return key_set
+
+    def genkey(self) -> str:
+        key_set = self._take_keypair()
+        with self._lock:
+            self._issued[key_set.private_key] = key_set.public_key
+            while len(self._issued) > self.size:
+                self._issued.popitem(last=False)
+        return key_set.private_key
+
+    def pubkey(self, private_key: str) -> str:
+        with self._lock:
+            public_key = self._issued.pop(private_key, None)
+        if public_key is None:
+            return self.backend.pubkey(private_key)
+        return public_key
+
+    def genpsk(self) -> str:
+        try:
+            psk = self._psks.get_nowait()
+        except Empty:
+            self._count(0, 1)
+            psk = self.backend.genpsk()
+        else:
+            self._count(1, 0)
+        self._drew(self._psks)
+        return psk
+
+    def genkeys(self, n: int, preshared_keys: bool = True) -> List[KeySet]:
+        keypairs = []
+        while len(keypairs) < n:
+            try:
+                keypairs.append(self._keypairs.get_nowait())
+            except Empty:
+                break
+        psks: List[Optional[str]] = []
+        while preshared_keys and len(psks) < n:
+            try:
+                psks.append(self._psks.get_nowait())
+            except Empty:
+                break
+        self._count(
+            len(keypairs) + len(psks),
+            (n - len(keypairs)) + (n - len(psks) if preshared_keys else 0),
+        )
+
+        if len(keypairs) < n:
+            keypairs.extend(
+                self.backend.genkeys(n - len(keypairs), preshared_keys=False)
+            )
+        if preshared_keys:
+            psks.extend(self.backend.genpsk() for _ in range(n - len(psks)))
+        else:
+            psks = [None] * n
+
+        self._drew(self._keypairs)
+        if preshared_keys:
+            self._drew(self._psks)
+
+        return [
+            KeySet(key_set.private_key, key_set.public_key, psk)
+            for key_set, psk in zip(keypairs, psks)
+        ]
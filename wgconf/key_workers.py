@@ -0,0 +1,155 @@
+from __future__ import annotations
+from typing import List, Optional
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+import asyncio
+import os
+
+from .keys import (
+    DEFAULT_CONCURRENCY,
+    KeyBackend,
+    KeySet,
+    WgKeyBackend,
+    check_concurrency,
+)
+
+# The backend each helper process works with, set by `_init_worker`
+_worker_backend: Optional[KeyBackend] = None
+
+
+def _init_worker(backend: KeyBackend) -> None:
+    global _worker_backend  # pylint: disable=global-statement
+    _worker_backend = backend
+
+
+def _worker_genkey() -> str:
+    return _worker_backend.genkey()
+
+
+def _worker_pubkey(private_key: str) -> str:
+    return _worker_backend.pubkey(private_key)
+
+
+def _worker_genpsk() -> str:
+    return _worker_backend.genpsk()
+
+
+def _worker_genkeys(n: int, preshared_keys: bool) -> List[KeySet]:
+    return _worker_backend.genkeys(n, preshared_keys)
+
+
+class ProcessPoolKeyBackend(KeyBackend):
+    """A `KeyBackend` that farms work out to a few long-lived helper processes.
+
+    Helpers are _spawned_ (not forked), so they start as small, fresh
+    interpreters no matter how big the parent has grown, and each one runs its
+    own copy of `backend` -- by default the `wg` binary. Requests and results
+    travel over the pool's pipes. `genkeys` splits a batch across all helpers,
+    so bulk generation uses every core.
+
+    The pool starts on first use and lives until `close()` (or the end of a
+    `with` block).
+    """
+
+    backend: KeyBackend
+    workers: int
+
+    def __init__(
+        self,
+        backend: Optional[KeyBackend] = None,
+        workers: Optional[int] = None,
+    ):
+        if backend is None:
+            backend = WgKeyBackend()
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        if workers < 1:
+            raise ValueError(f"`workers` must be at least 1, given {workers}")
+
+        self.backend = backend
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.backend!r}, "
+            + f"workers={self.workers})"
+        )
+
+    def __enter__(self) -> ProcessPoolKeyBackend:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.backend,),
+            )
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def genkey(self) -> str:
+        return self.executor.submit(_worker_genkey).result()
+
+    def pubkey(self, private_key: str) -> str:
+        return self.executor.submit(_worker_pubkey, private_key).result()
+
+    def genpsk(self) -> str:
+        return self.executor.submit(_worker_genpsk).result()
+
+    def _submit_genkeys(
+        self, n: int, preshared_keys: bool, chunks: int
+    ) -> List[Future]:
+        chunk, extra = divmod(n, chunks)
+        return [
+            self.executor.submit(
+                _worker_genkeys,
+                chunk + (1 if index < extra else 0),
+                preshared_keys,
+            )
+            for index in range(min(n, chunks))
+        ]
+
+    def genkeys(self, n: int, preshared_keys: bool = True) -> List[KeySet]:
+        key_sets = []
+        for future in self._submit_genkeys(n, preshared_keys, self.workers):
+            key_sets.extend(future.result())
+        return key_sets
+
+    async def async_genkey(self) -> str:
+        return await asyncio.wrap_future(self.executor.submit(_worker_genkey))
+
+    async def async_pubkey(self, private_key: str) -> str:
+        return await asyncio.wrap_future(
+            self.executor.submit(_worker_pubkey, private_key)
+        )
+
+    async def async_genpsk(self) -> str:
+        return await asyncio.wrap_future(self.executor.submit(_worker_genpsk))
+
+    async def async_genkeys(
+        self,
+        n: int,
+        preshared_keys: bool = True,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> List[KeySet]:
+        check_concurrency(concurrency)
+        results = await asyncio.gather(
+            *(
+                asyncio.wrap_future(future)
+                for future in self._submit_genkeys(
+                    n, preshared_keys, min(concurrency, self.workers)
+                )
+            )
+        )
+        return [key_set for key_sets in results for key_set in key_sets]
@@ -0,0 +1,330 @@
+from __future__ import annotations
+from typing import List, Optional, Union
+from pathlib import Path
+from collections import namedtuple
+from base64 import b64decode, b64encode
+from binascii import Error as Base64Error
+import asyncio
+import hashlib
+import hmac
+import os
+
+from .util import (
+    DEFAULT_WG_BIN_PATH,
+    async_genkey,
+    async_genpsk,
+    async_pubkey,
+    genkey,
+    genpsk,
+    pubkey,
+)
+
+KEY_LEN = 32
+
+# Curve25519 field prime and the `(A - 2) / 4` ladder constant, per RFC 7748
+_P = 2 ** 255 - 19
+_A24 = 121665
+_BASE_POINT = (9).to_bytes(KEY_LEN, "little")
+
+KeySet = namedtuple("KeySet", "private_key public_key preshared_key")
+
+DEFAULT_CONCURRENCY = 8
+
+
+def check_concurrency(concurrency: int) -> None:
+    if concurrency < 1:
+        raise ValueError(
+            f"`concurrency` must be at least 1, given {concurrency}"
+        )
+
+
+MIN_MASTER_SECRET_LEN = 32
+_HKDF_SALT = b"wgconf client keys v1"
+
+
+def _clamp(scalar: bytes) -> bytes:
+    clamped = bytearray(scalar)
+    clamped[0] &= 248
+    clamped[31] &= 127
+    clamped[31] |= 64
+    return bytes(clamped)
+
+
+def x25519(scalar: bytes, u_coordinate: bytes) -> bytes:
+    """The X25519 function from RFC 7748, section 5.
+
+    Straight-line Montgomery ladder over Python ints. It is _not_ constant
+    time, which is fine for generating keys on the box that will hold them,
+    but don't go exposing it as an oracle.
+    """
+    k = int.from_bytes(_clamp(scalar), "little")
+    x_1 = int.from_bytes(u_coordinate, "little") & ((1 << 255) - 1)
+    x_2, z_2, x_3, z_3 = 1, 0, x_1, 1
+    swap = 0
+
+    for t in reversed(range(255)):
+        k_t = (k >> t) & 1
+        swap ^= k_t
+        if swap:
+            x_2, x_3 = x_3, x_2
+            z_2, z_3 = z_3, z_2
+        swap = k_t
+
+        a = x_2 + z_2
+        aa = a * a % _P
+        b = x_2 - z_2
+        bb = b * b % _P
+        e = aa - bb
+        c = x_3 + z_3
+        d = x_3 - z_3
+        da = d * a % _P
+        cb = c * b % _P
+        x_3 = (da + cb) ** 2 % _P
+        z_3 = x_1 * (da - cb) ** 2 % _P
+        x_2 = aa * bb % _P
+        z_2 = e * (aa + _A24 * e) % _P
+
+    if swap:
+        x_2, z_2 = x_3, z_3
+
+    return (x_2 * pow(z_2, _P - 2, _P) % _P).to_bytes(KEY_LEN, "little")
+
+
+def encode_key(raw: bytes) -> str:
+    return b64encode(raw).decode("ascii")
+
+
+def decode_key(key: str) -> bytes:
+    """Decode a base64 key the same way `wg` does -- exactly 32 bytes, padded
+    out to 44 characters, or bust.
+    """
+    key = key.strip()
+    if len(key) != 44 or key[-1] != "=":
+        raise ValueError(f"Key is not the correct length or format: {key}")
+    try:
+        raw = b64decode(key, validate=True)
+    except Base64Error as error:
+        raise ValueError(
+            f"Key is not the correct length or format: {key}"
+        ) from error
+    if len(raw) != KEY_LEN:
+        raise ValueError(f"Key is not the correct length or format: {key}")
+    return raw
+
+
+def _hkdf_sha256(secret: bytes, info: bytes, length: int = KEY_LEN) -> bytes:
+    """HKDF (RFC 5869) over SHA-256, with our own fixed salt."""
+    prk = hmac.new(_HKDF_SALT, secret, hashlib.sha256).digest()
+    okm = b""
+    block = b""
+    counter = 1
+    while len(okm) < length:
+        block = hmac.new(
+            prk, block + info + bytes((counter,)), hashlib.sha256
+        ).digest()
+        okm += block
+        counter += 1
+    return okm[:length]
+
+
+def derive_key_set(master_secret: Union[bytes, str], name: str) -> KeySet:
+    """Derive a client's private, public and preshared keys from a master
+    secret and the client's name.
+
+    Same inputs, same keys -- every time, on any machine -- so a client config
+    can be rebuilt without generating (or storing) anything. Anyone holding
+    `master_secret` can derive every client's keys, so guard it like you would
+    the server's private key.
+    """
+    if isinstance(master_secret, str):
+        master_secret = master_secret.encode("utf_8")
+    if len(master_secret) < MIN_MASTER_SECRET_LEN:
+        raise ValueError(
+            f"Master secret must be at least {MIN_MASTER_SECRET_LEN} bytes"
+        )
+    name_bytes = name.encode("utf_8")
+    private_raw = _clamp(
+        _hkdf_sha256(master_secret, b"private key\x00" + name_bytes)
+    )
+    return KeySet(
+        encode_key(private_raw),
+        encode_key(x25519(private_raw, _BASE_POINT)),
+        encode_key(
+            _hkdf_sha256(master_secret, b"preshared key\x00" + name_bytes)
+        ),
+    )
+
+
+class KeyBackend:
+    """Where `Config` gets its keys from.
+
+    Backends produce the same base64 strings that `wg genkey`, `wg pubkey` and
+    `wg genpsk` print (minus the trailing newline).
+
+    Each method has an `async_` counterpart for use inside an event loop. By
+    default those run the blocking method on the loop's executor; backends
+    with natively async work (subprocesses) override them.
+    """
+
+    def genkey(self) -> str:
+        raise NotImplementedError
+
+    def pubkey(self, private_key: str) -> str:
+        raise NotImplementedError
+
+    def genpsk(self) -> str:
+        raise NotImplementedError
+
+    def genkeys(self, n: int, preshared_keys: bool = True) -> List[KeySet]:
+        """Generate `n` key sets -- private key, public key and (optionally)
+        preshared key -- in one go.
+
+        Backends that can do better than one-at-a-time should override this.
+        """
+        key_sets = []
+        for _ in range(n):
+            private_key = self.genkey()
+            key_sets.append(
+                KeySet(
+                    private_key,
+                    self.pubkey(private_key),
+                    self.genpsk() if preshared_keys else None,
+                )
+            )
+        return key_sets
+
+    async def async_genkey(self) -> str:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.genkey
+        )
+
+    async def async_pubkey(self, private_key: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.pubkey, private_key
+        )
+
+    async def async_genpsk(self) -> str:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.genpsk
+        )
+
+    async def async_genkeys(
+        self,
+        n: int,
+        preshared_keys: bool = True,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> List[KeySet]:
+        """Generate `n` key sets with at most `concurrency` of them in flight
+        at once.
+        """
+        check_concurrency(concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def gen_key_set() -> KeySet:
+            async with semaphore:
+                private_key = await self.async_genkey()
+                public_key = await self.async_pubkey(private_key)
+                preshared_key = None
+                if preshared_keys:
+                    preshared_key = await self.async_genpsk()
+                return KeySet(private_key, public_key, preshared_key)
+
+        return list(await asyncio.gather(*(gen_key_set() for _ in range(n))))
+
+
+class WgKeyBackend(KeyBackend):
+    """Shells out to the `wg` binary for every key, like we used to."""
+
+    wg_bin_path: Path
+
+    def __init__(self, wg_bin_path: Union[Path, str] = DEFAULT_WG_BIN_PATH):
+        self.wg_bin_path = Path(wg_bin_path)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self.wg_bin_path)!r})"
+
+    def genkey(self) -> str:
+        return genkey(self.wg_bin_path)
+
+    def pubkey(self, private_key: str) -> str:
+        return pubkey(private_key, self.wg_bin_path)
+
+    def genpsk(self) -> str:
+        return genpsk(self.wg_bin_path)
+
+    async def async_genkey(self) -> str:
+        return await async_genkey(self.wg_bin_path)
+
+    async def async_pubkey(self, private_key: str) -> str:
+        return await async_pubkey(private_key, self.wg_bin_path)
+
+    async def async_genpsk(self) -> str:
+        return await async_genpsk(self.wg_bin_path)
+
+
+class PythonKeyBackend(KeyBackend):
+    """Derives Curve25519 keys in-process, no `wg` binary (or fork) required.
+
+    Mirrors `wg` exactly: private keys are 32 random bytes clamped per RFC
+    7748, public keys are X25519 of the (clamped) private key and the base
+    point, and preshared keys are 32 random bytes as-is.
+    """
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+    def genkey(self) -> str:
+        return encode_key(_clamp(os.urandom(KEY_LEN)))
+
+    def pubkey(self, private_key: str) -> str:
+        return encode_key(x25519(decode_key(private_key), _BASE_POINT))
+
+    def genpsk(self) -> str:
+        return encode_key(os.urandom(KEY_LEN))
+
+    def genkeys(self, n: int, preshared_keys: bool = True) -> List[KeySet]:
+        # One read from the OS for the whole batch
+        stride = KEY_LEN * 2 if preshared_keys else KEY_LEN
+        entropy = memoryview(os.urandom(stride * n))
+        key_sets = []
+        for offset in range(0, stride * n, stride):
+            private_raw = _clamp(entropy[offset : offset + KEY_LEN])
+            preshared_key: Optional[str] = None
+            if preshared_keys:
+                preshared_key = encode_key(
+                    entropy[offset + KEY_LEN : offset + stride]
+                )
+            key_sets.append(
+                KeySet(
+                    encode_key(private_raw),
+                    encode_key(x25519(private_raw, _BASE_POINT)),
+                    preshared_key,
+                )
+            )
+        return key_sets
+
+    async def async_genkeys(
+        self,
+        n: int,
+        preshared_keys: bool = True,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> List[KeySet]:
+        check_concurrency(concurrency)
+        # Hand the executor `concurrency` chunks rather than 3 calls per key
+        loop = asyncio.get_running_loop()
+        chunk, extra = divmod(n, concurrency)
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    None,
+                    self.genkeys,
+                    chunk + (1 if index < extra else 0),
+                    preshared_keys,
+                )
+                for index in range(min(n, concurrency))
+            )
+        )
+        return [key_set for key_sets in results for key_set in key_sets]
+
+
+DEFAULT_KEY_BACKEND = PythonKeyBackend()
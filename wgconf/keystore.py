@@ -0,0 +1,142 @@
+from __future__ import annotations
+from typing import Dict, Iterator, Optional, Union
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import sqlite3
+
+from .keys import KeySet
+
+
+class KeyStore:
+    """Remembers client keys by client (peer) name.
+
+    The server config only ever holds a client's _public_ key, so without
+    somewhere to keep the private key (and PSK) we can't rebuild a client's
+    config later without re-keying it.
+    """
+
+    def get(self, name: str) -> Optional[KeySet]:
+        raise NotImplementedError
+
+    def put(self, name: str, key_set: KeySet) -> None:
+        raise NotImplementedError
+
+    def delete(self, name: str) -> None:
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self) -> Iterator[KeyStore]:
+        """Group a bunch of `put` / `delete` calls. Stores that can make that
+        cheaper (one transaction instead of many) override this.
+        """
+        yield self
+
+
+class MemoryKeyStore(KeyStore):
+    """Keeps keys in a `dict`, for tests and throwaway use."""
+
+    def __init__(self):
+        self._key_sets: Dict[str, KeySet] = {}
+
+    def get(self, name: str) -> Optional[KeySet]:
+        return self._key_sets.get(name)
+
+    def put(self, name: str, key_set: KeySet) -> None:
+        self._key_sets[name] = KeySet(*key_set)
+
+    def delete(self, name: str) -> None:
+        self._key_sets.pop(name, None)
+
+
+class SQLiteKeyStore(KeyStore):
+    """Keeps keys in an SQLite database file, created `0600`.
+
+    `scope` namespaces the names, so several interfaces can share one file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS client_keys (
+            scope TEXT NOT NULL,
+            name TEXT NOT NULL,
+            private_key TEXT NOT NULL,
+            public_key TEXT NOT NULL,
+            preshared_key TEXT,
+            PRIMARY KEY (scope, name)
+        )
+    """
+
+    path: Union[Path, str]
+    scope: str
+
+    def __init__(self, path: Union[Path, str], scope: str = ""):
+        if path != ":memory:":
+            path = Path(path)
+            if not path.exists():
+                os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+
+        self.path = path
+        self.scope = scope
+        self._connection = sqlite3.connect(str(path))
+        self._batching = False
+        self._connection.execute(self.SCHEMA)
+        self._connection.commit()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({str(self.path)!r}, "
+            + f"scope={self.scope!r})"
+        )
+
+    def __enter__(self) -> SQLiteKeyStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _commit(self) -> None:
+        if not self._batching:
+            self._connection.commit()
+
+    def get(self, name: str) -> Optional[KeySet]:
+        row = self._connection.execute(
+            "SELECT private_key, public_key, preshared_key FROM client_keys "
+            + "WHERE scope = ? AND name = ?",
+            (self.scope, name),
+        ).fetchone()
+        return None if row is None else KeySet(*row)
+
+    def put(self, name: str, key_set: KeySet) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO client_keys "
+            + "(scope, name, private_key, public_key, preshared_key) "
+            + "VALUES (?, ?, ?, ?, ?)",
+            (self.scope, name, *key_set),
+        )
+        self._commit()
+
+    def delete(self, name: str) -> None:
+        self._connection.execute(
+            "DELETE FROM client_keys WHERE scope = ? AND name = ?",
+            (self.scope, name),
+        )
+        self._commit()
+
+    @contextmanager
+    def batch(self) -> Iterator[SQLiteKeyStore]:
+        if self._batching:
+            yield self
+            return
+        self._batching = True
+        try:
+            yield self
+        except BaseException:
+            self._connection.rollback()
+            raise
+        else:
+            self._connection.commit()
+        finally:
+            self._batching = False
@@ -1,17 +1,39 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+from operator import attrgetter
+from sys import intern
 import re
 from dataclasses import dataclass
 
+from .util import iter_lines
+
 # Pylint doesn't like `REGEXP` constant in dataclasses?
 # pylint: disable=invalid-name
 
 
 class Line:
+    """Base for every kind of line. All of them use `__slots__` -- a big
+    config is mostly `Line` objects, and a per-instance `__dict__` would be
+    most of their size -- so each class's `__init__` sets every slot.
+    """
+
     REGEXP = None  # For the linters in the crowd tonight!!
 
-    prev: Optional[Line] = None
-    next: Optional[Line] = None
+    __slots__ = ("prev", "next", "section_head")
+
+    # Section heads (and only them) start their section's body
+    is_head = False
+
+    prev: Optional[Line]
+    next: Optional[Line]
+
+    # The head of the section we're in, once that section has been indexed.
+    # Heads hold the indexes (see `Section`): `option_index` (option name ->
+    # options) and `meta_index` (meta name -> meta comments)
+    section_head: Optional[Line]
+
+    def __init__(self):
+        self.prev = self.next = self.section_head = None
 
     @classmethod
     def from_string(cls, string: str) -> Optional[Line]:
@@ -28,6 +50,14 @@ class Line:
         return cls(*match.groups())
 
     def remove(self) -> None:
+        if self.section_head is not None:
+            self._leave_index()
+        elif self.is_head:
+            # Our body joins the section before us
+            if (head := _head_of(self.prev)) is not None:
+                section_changed(head)
+            if self.owner is not None:
+                self.owner._section_removed(self)
         if self.prev is not None:
             self.prev.next = self.next
         if self.next is not None:
@@ -40,18 +70,114 @@ class Line:
             self.next.prev = line
         line.prev = self
         self.next = line
+        line._join_index()
 
     def insert_prev(self, line: Line) -> None:
         if self.prev is not None:
             self.prev.next = line
+            line.prev = self.prev
         line.next = self
         self.prev = line
+        line._join_index()
+
+    def _join_index(self) -> None:
+        """We were just linked in; join the indexes of the section we landed
+        in, if it has them. A head splits that section instead, and joins its
+        `File`'s section index.
+        """
+        if (before := self.prev) is None:
+            return
+        if self.is_head:
+            if (head := _head_of(before)) is not None:
+                section_changed(head)
+                if head.owner is not None:
+                    head.owner._head_linked(self, head)
+            return
+        head = before if before.is_head else before.section_head
+        if head is None or head.option_index is None:
+            return
+        section_changed(head)
+        self.section_head = head
+        self._add_to_index(head)
+
+    def _leave_index(self) -> None:
+        head = self.section_head
+        self.section_head = None
+        self._remove_from_index(head)
+        section_changed(head)
+
+    def _index_of(self, head: Line) -> Optional[Dict[str, List[Line]]]:
+        """Which of `head`'s indexes we go in, if any."""
+        return None
 
+    def _index_key(self) -> Optional[str]:
+        return None
 
-@dataclass
+    def _add_to_index(self, head: Line) -> None:
+        index = self._index_of(head)
+        if index is None or (key := self._index_key()) is None:
+            return
+        lines = index.setdefault(key, [])
+        if lines:
+            # Dups -- keep them in file order
+            lines[:] = [
+                line
+                for line in head.body()
+                if line._index_of(head) is index and line._index_key() == key
+            ]
+        else:
+            lines.append(self)
+
+    def _remove_from_index(self, head: Line) -> None:
+        index = self._index_of(head)
+        if index is None or (key := self._index_key()) is None:
+            return
+        lines = index.get(key, [])
+        for position, line in enumerate(lines):
+            if line is self:
+                del lines[position]
+                break
+        if not lines:
+            index.pop(key, None)
+
+    def body(self) -> Iterator[Line]:
+        """Lines following a head, up to the next head."""
+        line = self.next
+        while line is not None and not line.is_head:
+            yield line
+            line = line.next
+
+
+def _head_of(line: Optional[Line]) -> Optional[Line]:
+    """The head of the section `line` is in (`line` itself if it's a head),
+    walking back to it if need be.
+    """
+    while line is not None and not line.is_head:
+        if line.section_head is not None:
+            return line.section_head
+        line = line.prev
+    return line
+
+
+def section_changed(head: Line) -> None:
+    """Something in `head`'s (indexed) section changed: drop its `frozen`
+    copy, and tell its `File`.
+    """
+    head.frozen = None
+    if head.owner is not None:
+        head.owner._changed()  # pylint: disable=protected-access
+
+
+# What `Comment._meta` holds until `meta` has been worked out
+_UNPARSED = object()
+
+
+@dataclass(init=False)
 class Blank(Line):
     REGEXP = re.compile(r"\s*")
 
+    __slots__ = ()
+
     @classmethod
     def from_match(cls, match: re.Match) -> Blank:
         return Blank()
@@ -60,46 +186,258 @@ class Blank(Line):
         return ""
 
 
-@dataclass
+@dataclass(init=False)
 class Comment(Line):
     REGEXP = re.compile(r"#\ ?(.*)")
 
+    __slots__ = ("_value", "_meta")
+
+    # A property over the slot, set on the class below
     value: str
 
+    def __init__(self, value: str):
+        self.prev = self.next = self.section_head = None
+        self._value = value
+        self._meta = _UNPARSED
+
+    def _set_value(self, value: str) -> None:
+        # Re-file ourselves under our new meta name (if any)
+        head = self.section_head
+        if head is not None:
+            self._remove_from_index(head)
+        self._value = value
+        self._meta = _UNPARSED
+        if head is not None:
+            self._add_to_index(head)
+            section_changed(head)
+
+    @property
+    def meta(self) -> Optional[Tuple[str, str]]:
+        """`(name, value)` if we're a `# Name = value` meta comment. Parsed
+        once per `value`.
+        """
+        if self._meta is _UNPARSED:
+            match = Option.REGEXP.fullmatch(self.value)
+            self._meta = None if match is None else match.group(1, 2)
+        return self._meta
+
+    def _index_of(self, head: Line) -> Optional[Dict[str, List[Line]]]:
+        return head.meta_index
+
+    def _index_key(self) -> Optional[str]:
+        return None if (meta := self.meta) is None else meta[0]
+
     def __str__(self) -> str:
         return f"# {self.value}"
 
 
-@dataclass
+# Like `OptBase`'s (see below)
+Comment.value = property(attrgetter("_value"), Comment._set_value)
+
+
+@dataclass(init=False)
 class OptBase(Line):
+    __slots__ = ("_name", "_value")
+
+    # Properties over the slots, set on the class below
     name: str
     value: str
 
+    def __init__(self, name: str, value: str):
+        self.prev = self.next = self.section_head = None
+        self._name = name
+        self._value = value
+
+    def _set_name(self, name: str) -> None:
+        # Re-file ourselves under our new name
+        head = self.section_head
+        if head is not None:
+            self._remove_from_index(head)
+        self._name = name
+        if head is not None:
+            self._add_to_index(head)
+            section_changed(head)
+
+    def _set_value(self, value: str) -> None:
+        self._value = value
+        if self.section_head is not None:
+            section_changed(self.section_head)
+
     @classmethod
     def from_match(cls, match: re.Match) -> OptBase:
         # pylint: disable=unexpected-keyword-arg
         return cls(name=match.group(1), value=match.group(2).rstrip())
 
+    def _index_of(self, head: Line) -> Optional[Dict[str, List[Line]]]:
+        return head.option_index
 
-@dataclass
+    def _index_key(self) -> Optional[str]:
+        return self.name
+
+
+# Reads go straight to the slots; only setting needs to tell the section. Set
+# after `@dataclass` is done, so they don't become the fields' defaults
+OptBase.name = property(attrgetter("_name"), OptBase._set_name)
+OptBase.value = property(attrgetter("_value"), OptBase._set_value)
+
+
+@dataclass(init=False)
 class Option(OptBase):
     REGEXP = re.compile(r"([A-Za-z]+)\s*=\s*(.+)")
 
+    __slots__ = ()
+
     def __str__(self) -> str:
         return f"{self.name} = {self.value}"
 
 
-@dataclass
+@dataclass(init=False)
 class SectionHead(Line):
     REGEXP = re.compile(r"\[([A-Za-z]+)\]\s*")
 
+    # `owner` is the `File` whose section index we're in, if any, and
+    # `frozen` the `FrozenSection` of us from the last snapshot, while we
+    # haven't changed since
+    __slots__ = ("_value", "option_index", "meta_index", "owner", "frozen")
+
+    is_head = True
+
+    # A property over the slot, set on the class below
     value: str
 
+    def __init__(self, value: str):
+        self.prev = self.next = self.section_head = None
+        self.option_index = self.meta_index = self.owner = self.frozen = None
+        self._value = value
+
+    def _set_value(self, value: str) -> None:
+        kind = self._value
+        self._value = value
+        if self.owner is not None:
+            self.owner._section_rekinded(self, kind)
+        section_changed(self)
+
     def __str__(self) -> str:
         return f"[{self.value}]"
 
 
+# Like `OptBase`'s
+SectionHead.value = property(attrgetter("_value"), SectionHead._set_value)
+
+
+class LazySectionHead(SectionHead):
+    """A section head whose body lines haven't been parsed yet.
+
+    Holds the section's slice of the source text. Until something reads
+    `next`, the stored link points straight at whatever follows the section
+    (usually the next head); the first read parses the body and splices it in
+    between. Assigning `next` while unloaded re-points what follows the
+    (pending) body, which is what anyone who reached us through the following
+    line's `prev` means by it.
+
+    The first `Name` meta value is picked up by the scan that created us, so
+    it's available without loading (see `peek_meta`).
+
+    Subclasses can keep the body some other way by overriding `_body_lines`
+    (and `peek_strings`, to render it without loading).
+    """
+
+    __slots__ = ("name_meta", "_next", "_body")
+
+    name_meta: Optional[str]
+
+    def __init__(
+        self,
+        value: str,
+        source: str,
+        start: int,
+        end: int,
+        origin,
+        name_meta: Optional[str] = None,
+    ):
+        super().__init__(value)
+        self.name_meta = name_meta
+        self._next = None
+        self._body = (source, start, end, origin)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._body is None
+
+    def peek_next(self) -> Optional[Line]:
+        """`next` without loading -- the next section's head if we're not
+        loaded.
+        """
+        return self._next
+
+    def peek_meta(self, name: str) -> Optional[List[str]]:
+        """Values of our `# name = ...` meta comments if we can tell without
+        loading, else `None`.
+        """
+        if name == "Name":
+            return [] if self.name_meta is None else [self.name_meta]
+        return None
+
+    def peek_strings(self) -> Optional[Iterator[str]]:
+        """Our body, rendered, if we can do it without loading."""
+        return None
+
+    def _body_lines(self, body) -> Iterator[Line]:
+        source, start, end, origin = body
+        for index, string in enumerate(iter_lines(source, start, end)):
+            line = parse_line(string)
+            if line is None:
+                line_num = source.count("\n", 0, start) + index + 1
+                raise Exception(f"{origin}:{line_num} Bad line: {string}")
+            yield line
+
+    def load(self) -> None:
+        if self._body is None:
+            return
+        # Parse it all before linking any of it in, so a bad line leaves us
+        # unloaded (and still linked to what follows) rather than cut short
+        lines = list(self._body_lines(self._body))
+        self._body = None
+
+        after = self._next
+        tail = self
+        for line in lines:
+            if tail is self:
+                self._next = line
+            else:
+                tail.next = line
+            line.prev = tail
+            tail = line
+
+        if tail is not self:
+            tail.next = after
+            if after is not None:
+                after.prev = tail
+
+        if self.frozen is not None:
+            # Loading didn't change anything, so the snapshot we're in can
+            # keep sharing us -- as long as we hear about changes from now on
+            index_section(self)
+
+    def __get_next(self) -> Optional[Line]:
+        self.load()
+        return self._next
+
+    def __set_next(self, line: Optional[Line]) -> None:
+        self._next = line
+
+    next = property(__get_next, __set_next)
+
+
 class DefaultSectionHead(Line):
+    __slots__ = ("option_index", "meta_index", "owner", "frozen")
+
+    is_head = True
+
+    def __init__(self):
+        super().__init__()
+        self.option_index = self.meta_index = self.owner = self.frozen = None
+
     @classmethod
     def match(cls, line: str) -> Optional[re.Match]:
         return None
@@ -109,3 +447,52 @@ class DefaultSectionHead(Line):
 
     def insert_prev(self, line: Line) -> None:
         raise NotImplementedError("Can't insert before DefaultSectionHead")
+
+
+# All four line kinds in one pattern, alternatives in the same order `File` has
+# always tried the classes in. `lastindex` tells us which one hit.
+_LINE_REGEXP = re.compile(
+    r"(\s*)"  # 1: Blank
+    r"|#\ ?(.*)"  # 2: Comment
+    r"|\[([A-Za-z]+)\]\s*"  # 3: SectionHead
+    r"|([A-Za-z]+)\s*=\s*(.+)"  # 4, 5: Option
+)
+
+
+def parse_line(string: str) -> Optional[Line]:
+    """Build the `Line` for `string` in a single match, or `None` if it isn't
+    any kind of line we know.
+
+    Same result as trying `Blank`, `Comment`, `SectionHead` and `Option`
+    `from_string` in turn, just without the four separate matches.
+    """
+    match = _LINE_REGEXP.fullmatch(string)
+    if match is None:
+        return None
+    index = match.lastindex
+    if index == 1:
+        return Blank()
+    if index == 2:
+        return Comment(match.group(2))
+    if index == 3:
+        return SectionHead(match.group(3))
+    # Names repeat on every peer; share one string for each
+    return Option(intern(match.group(4)), match.group(5).rstrip())
+
+
+def index_section(head: Line) -> None:
+    """Build `head`'s option and meta indexes (see `Section`) by one pass
+    over its section. After that `Line.insert_next` / `insert_prev` /
+    `remove` and setting a line's `value` keep them up to date, and tell
+    the head about changes.
+    """
+    options: Dict[str, List[Option]] = {}
+    metas: Dict[str, List[Comment]] = {}
+    for line in head.body():
+        line.section_head = head
+        if isinstance(line, Option):
+            options.setdefault(line.name, []).append(line)
+        elif isinstance(line, Comment) and (meta := line.meta):
+            metas.setdefault(meta[0], []).append(line)
+    head.meta_index = metas
+    head.option_index = options
@@ -0,0 +1,248 @@
+from __future__ import annotations
+from typing import Callable, Iterator, Optional, Tuple, Union
+from functools import lru_cache
+from pathlib import Path
+import mmap
+import re
+
+from .file import File
+from .peer import Peer
+from .section import DUP_TYPE, DEFAULT_DUP, Section
+from .util import iter_lines
+
+# A section head, from its `[` through the end of its line (newline included)
+_HEAD_REGEXP = re.compile(rb"\[([A-Za-z]+)\][^\S\n]*(?:\n|\Z)")
+
+_ENCODING = "utf_8"
+
+# (kind, head start, body start, section end) -- offsets into the mapping
+_SectionSpan = Tuple[str, int, int, int]
+
+
+def _value_pattern(value: Optional[str]) -> bytes:
+    if value is None:
+        return rb"([^\n]+?)"
+    return rb"(" + re.escape(value.encode(_ENCODING)) + rb")"
+
+
+@lru_cache(maxsize=64)
+def _option_regexp(name: str, value: Optional[str] = None) -> re.Pattern:
+    """Matches `name = value` option lines -- any value if `value` is `None`.
+    Group 1 is the value, less trailing whitespace, like `Option` leaves it.
+    """
+    return re.compile(
+        rb"^"
+        + re.escape(name.encode())
+        + rb"[^\S\n]*=[^\S\n]*"
+        + _value_pattern(value)
+        + rb"[^\S\n]*$",
+        re.MULTILINE,
+    )
+
+
+@lru_cache(maxsize=64)
+def _meta_regexp(name: str, value: Optional[str] = None) -> re.Pattern:
+    """Matches `# name = value` meta comments, like `meta_for` reads them."""
+    return re.compile(
+        rb"^#\ ?"
+        + re.escape(name.encode())
+        + rb"[^\S\n]*=[^\S\n]*"
+        + _value_pattern(value)
+        + rb"\r?$",
+        re.MULTILINE,
+    )
+
+
+class MappedFile:
+    """Read-only, memory-mapped view of a config file for quick questions.
+
+    Answers things like "how many peers?", "is there a peer named X / with
+    public key Y?" and "what's the ListenPort?" by searching the mapped bytes
+    directly, without building any `Line` objects. When you need the real
+    thing, `file()` parses a full `File`, and `find_peer` parses just the
+    section it found.
+
+    Shares `File`'s idea of the format: the first `Name` meta and (with the
+    default "first" `dup`) the first occurrence of an option in a section are
+    the ones that count.
+    """
+
+    path: Path
+    dup: DUP_TYPE
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        dup: DUP_TYPE = DEFAULT_DUP,
+    ):
+        self.path = path if isinstance(path, Path) else Path(path)
+        self.dup = dup
+        with open(self.path, "rb") as fp:
+            size = fp.seek(0, 2)
+            if size == 0:
+                self._buffer = b""  # Can't map an empty file
+            else:
+                self._buffer = mmap.mmap(
+                    fp.fileno(), 0, access=mmap.ACCESS_READ
+                )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self.path)!r})"
+
+    def __enter__(self) -> MappedFile:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._buffer = b""
+
+    def _head_at(self, position: int) -> Optional[re.Match]:
+        return _HEAD_REGEXP.match(self._buffer, position)
+
+    def _next_head(self, position: int) -> Optional[re.Match]:
+        """The first section head starting at or after `position`, which must
+        be the start of a line.
+        """
+        buffer = self._buffer
+        if match := self._head_at(position):
+            return match
+        position = buffer.find(b"\n[", position)
+        while position != -1:
+            if match := self._head_at(position + 1):
+                return match
+            position = buffer.find(b"\n[", position + 1)
+        return None
+
+    def _spans(self) -> Iterator[_SectionSpan]:
+        match = self._next_head(0)
+        while match is not None:
+            following = self._next_head(match.end())
+            end = len(self._buffer) if following is None else following.start()
+            yield (
+                match.group(1).decode(_ENCODING),
+                match.start(),
+                match.end(),
+                end,
+            )
+            match = following
+
+    def _span_around(self, position: int) -> Optional[_SectionSpan]:
+        """The section containing `position`, if it's in one (and not the
+        default section).
+        """
+        buffer = self._buffer
+        start = buffer.rfind(b"\n[", 0, position)
+        while True:
+            head_start = 0 if start == -1 else start + 1
+            if match := self._head_at(head_start):
+                following = self._next_head(match.end())
+                end = len(buffer) if following is None else following.start()
+                return (
+                    match.group(1).decode(_ENCODING),
+                    match.start(),
+                    match.end(),
+                    end,
+                )
+            if start == -1:
+                return None
+            start = buffer.rfind(b"\n[", 0, start)
+
+    def _section(self, span: _SectionSpan) -> Section:
+        file = File.from_stream(
+            iter_lines(self._buffer, span[1], span[3], _ENCODING),
+            dup=self.dup,
+        )
+        return list(file.sections())[1]
+
+    def count(self, kind: str) -> int:
+        return sum(1 for span in self._spans() if span[0] == kind)
+
+    def peer_count(self) -> int:
+        return self.count("Peer")
+
+    def option(self, kind: str, name: str) -> Optional[str]:
+        """Value of option `name` in the first `kind` section (raw, as it
+        appears in the file)."""
+        for span in self._spans():
+            if span[0] == kind:
+                return self._value(_option_regexp(name), span)
+        return None
+
+    def interface_option(self, name: str) -> Optional[str]:
+        return self.option("Interface", name)
+
+    def _value(
+        self, regexp: re.Pattern, span: _SectionSpan
+    ) -> Optional[str]:
+        if match := regexp.search(self._buffer, span[2], span[3]):
+            return match.group(1).decode(_ENCODING)
+        return None
+
+    def _find(
+        self,
+        regexp: re.Pattern,
+        kind: str,
+        accept: Callable[[_SectionSpan], bool],
+    ) -> Optional[_SectionSpan]:
+        """First `kind` section containing a `regexp` match that `accept`
+        agrees is a real hit.
+        """
+        position = 0
+        while match := regexp.search(self._buffer, position):
+            position = match.end() + 1
+            span = self._span_around(match.start())
+            if span is None:
+                continue
+            if span[0] == kind and accept(span):
+                return span
+            position = max(position, span[3])
+        return None
+
+    def _find_peer_span(
+        self,
+        name: Optional[str],
+        public_key: Optional[str],
+    ) -> Optional[_SectionSpan]:
+        def accept(span: _SectionSpan) -> bool:
+            # Only the first `Name` meta and `PublicKey` in a section count
+            return (
+                name is None or self._value(_meta_regexp("Name"), span) == name
+            ) and (
+                public_key is None
+                or self._value(_option_regexp("PublicKey"), span) == public_key
+            )
+
+        if name is not None:
+            return self._find(_meta_regexp("Name", name), "Peer", accept)
+        if public_key is not None:
+            return self._find(
+                _option_regexp("PublicKey", public_key), "Peer", accept
+            )
+        raise ValueError("Give a `name`, a `public_key` or both")
+
+    def has_peer(
+        self,
+        name: Optional[str] = None,
+        public_key: Optional[str] = None,
+    ) -> bool:
+        return self._find_peer_span(name, public_key) is not None
+
+    def find_peer(
+        self,
+        name: Optional[str] = None,
+        public_key: Optional[str] = None,
+    ) -> Optional[Peer]:
+        """Parse just the [Peer] matching `name` and/or `public_key`. It's a
+        detached copy; changing it doesn't touch the file.
+        """
+        if span := self._find_peer_span(name, public_key):
+            return Peer(self._section(span).head, dup=self.dup)
+        return None
+
+    def file(self, lazy: bool = False) -> File:
+        """Parse the whole thing into a `File`."""
+        return File(self.path, dup=self.dup, lazy=lazy)
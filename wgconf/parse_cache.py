@@ -0,0 +1,172 @@
+from __future__ import annotations
+from typing import Iterable, List, Optional, Tuple, Union
+from collections import namedtuple
+from hashlib import blake2b, sha256
+from pathlib import Path
+from sys import intern
+import marshal
+import os
+import tempfile
+
+from .line import Blank, Comment, Line, Option, SectionHead
+
+ParseCacheStats = namedtuple("ParseCacheStats", "hits misses")
+
+# (inode, size, mtime_ns, content digest) of the file an entry was parsed from
+CacheKey = Tuple[int, int, int, bytes]
+
+_MAGIC = b"wgconf-parse-cache-1\n"
+
+# One byte per line in an entry's `kinds`
+_BLANK = ord("B")
+_COMMENT = ord("C")
+_HEAD = ord("H")
+_OPTION = ord("O")
+
+
+def _default_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "wgconf" / "parse"
+
+
+def encode_lines(lines: Iterable[Line]) -> Tuple[bytes, List[str]]:
+    """Flatten parsed lines to `(kinds, strings)` -- one kind byte per line,
+    and every line's text fields in order. Cheap to store or pickle, unlike
+    the linked lines themselves.
+    """
+    kinds = bytearray()
+    strings = []
+    for line in lines:
+        if isinstance(line, Blank):
+            kinds.append(_BLANK)
+        elif isinstance(line, Comment):
+            kinds.append(_COMMENT)
+            strings.append(line.value)
+        elif isinstance(line, SectionHead):
+            kinds.append(_HEAD)
+            strings.append(line.value)
+        elif isinstance(line, Option):
+            kinds.append(_OPTION)
+            strings.append(line.name)
+            strings.append(line.value)
+        else:
+            raise TypeError(f"Can't cache line {line!r}")
+    return (bytes(kinds), strings)
+
+
+def decode_lines(kinds: bytes, strings: List[str]) -> List[Line]:
+    """Rebuild (unlinked) lines from what `encode_lines` made. Raises
+    `ValueError` if `kinds` and `strings` don't go together.
+    """
+    lines: List[Line] = []
+    append = lines.append
+    rest = iter(strings)
+    take = rest.__next__
+    try:
+        for kind in kinds:
+            if kind == _OPTION:
+                append(Option(intern(take()), take()))
+            elif kind == _COMMENT:
+                append(Comment(take()))
+            elif kind == _HEAD:
+                append(SectionHead(take()))
+            else:
+                append(Blank())
+    except StopIteration:
+        raise ValueError("Fewer strings than the kinds need") from None
+    if next(rest, None) is not None:
+        raise ValueError("More strings than the kinds need")
+    return lines
+
+
+class ParseCache:
+    """Keeps parsed `File` line models on disk so unchanged files don't have
+    to be tokenized again.
+
+    Entries are keyed by the file's path and checked against its inode, size,
+    mtime and a hash of its contents; any mismatch is a miss, and the entry is
+    replaced with a fresh parse. Entries hold everything in the file (private
+    keys included), so the directory is created `0700` and entries `0600`.
+
+    Pass one to `File` (or `Config`) as `parse_cache`. `stats` counts hits and
+    misses.
+    """
+
+    dir: Path
+
+    def __init__(self, dir: Union[Path, str, None] = None):
+        # pylint: disable=redefined-builtin
+        self.dir = _default_dir() if dir is None else Path(dir)
+        self._hits = 0
+        self._misses = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self.dir)!r})"
+
+    @property
+    def stats(self) -> ParseCacheStats:
+        return ParseCacheStats(self._hits, self._misses)
+
+    def key(self, path: Path, data: bytes) -> CacheKey:
+        stat = os.stat(path)
+        return (
+            stat.st_ino,
+            stat.st_size,
+            stat.st_mtime_ns,
+            blake2b(data, digest_size=20).digest(),
+        )
+
+    def entry_path(self, path: Path) -> Path:
+        name = sha256(str(Path(path).resolve()).encode("utf_8")).hexdigest()
+        return self.dir / name
+
+    def get(self, path: Path, key: CacheKey) -> Optional[List[Line]]:
+        """Lines parsed from `path` last time, if it hasn't changed since."""
+        entry_path = self.entry_path(path)
+        try:
+            with open(entry_path, "rb") as fp:
+                entry = fp.read()
+            if not entry.startswith(_MAGIC):
+                raise ValueError("Bad magic")
+            # `marshal.loads` on the whole entry is several times quicker than
+            # `marshal.load` on the open file
+            entry_key, kinds, strings = marshal.loads(
+                memoryview(entry)[len(_MAGIC) :]
+            )
+            if tuple(entry_key) == key:
+                lines = decode_lines(kinds, strings)
+            else:
+                lines = None  # Stale
+        except FileNotFoundError:
+            self._misses += 1
+            return None
+        except (EOFError, ValueError, TypeError):
+            # Corrupt or from some other version of us
+            lines = None
+
+        if lines is None:
+            self.invalidate(path)
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        return lines
+
+    def put(self, path: Path, key: CacheKey, lines: Iterable[Line]) -> None:
+        kinds, strings = encode_lines(lines)
+        self.dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(_MAGIC)
+                marshal.dump((key, kinds, strings), fp)
+            os.replace(tmp_path, self.entry_path(path))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def invalidate(self, path: Path) -> None:
+        try:
+            os.unlink(self.entry_path(path))
+        except FileNotFoundError:
+            pass
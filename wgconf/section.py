@@ -5,7 +5,7 @@ from collections import namedtuple
 
 from typeguard import check_type
 
-from .util import PropValue, find, last
+from .util import PropValue, first, last
 from .typing import (
     decode,
     is_list as is_list_typing,
@@ -18,6 +18,8 @@ from .line import (
     Option,
     SectionHead,
     DefaultSectionHead,
+    LazySectionHead,
+    index_section,
 )
 
 DUP_TYPE = Literal["first", "list"]  # pylint: disable=invalid-name
@@ -27,8 +29,8 @@ Meta = namedtuple("Meta", "comment name value")
 
 
 def meta_for(comment: Comment) -> Optional[Meta]:
-    if match := Option.REGEXP.fullmatch(comment.value):
-        return Meta(comment, match.group(1), match.group(2))
+    if meta := comment.meta:
+        return Meta(comment, *meta)
     return None
 
 
@@ -92,6 +94,16 @@ class Prop(property):
         else:
             section[self.option_name] = value
 
+    def check(self, value) -> None:
+        """Raise the `TypeError` setting us to `value` would, if any."""
+        if value is None or value == "":
+            if self.required:
+                check_type(f"prop for {self.option_name}", None, self.type)
+        else:
+            check_type(
+                f"prop for {self.option_name}", self.cast(value), self.type
+            )
+
     def is_set(self, section) -> bool:
         if self.meta:
             return section.has_meta(self.option_name)
@@ -184,9 +196,21 @@ class Section:
     def has_meta(self, name: str) -> bool:
         return self.get_meta(name) is not None
 
+    def _peek_meta(self, name: str) -> Optional[List[str]]:
+        """What an unloaded `LazySectionHead` can tell us about the `name`
+        meta without loading (`None` if it can't).
+        """
+        head = self._head
+        if isinstance(head, LazySectionHead) and not head.is_loaded:
+            return head.peek_meta(name)
+        return None
+
     def get_meta(self, name: str) -> Optional[str]:
-        if meta := find(self.meta(), lambda m: m.name == name):
-            return meta.value
+        if (values := self._peek_meta(name)) is not None:
+            return values[0] if values else None
+        if comments := self._metas_named(name):
+            return comments[0].meta[1]
+        return None
 
     def set_meta(self, name: str, value: Any) -> None:
         string = encode_value(value)
@@ -198,8 +222,8 @@ class Section:
         comment_value = f"{name} = {string}"
 
         # pylint: disable=too-many-function-args
-        if meta := find(self.meta(), lambda m: m.name == name):
-            meta.comment.value = comment_value
+        if comments := self._metas_named(name):
+            comments[0].value = comment_value
         else:
             comment = Comment(comment_value)
             if meta := last(self.meta()):
@@ -209,8 +233,25 @@ class Section:
             line.insert_next(comment)
 
     def delete_meta(self, name: str) -> None:
-        for meta in (c for c in self.meta() if c.name == name):
-            meta.comment.remove()
+        for comment in list(self._metas_named(name)):
+            comment.remove()
+
+    def _index(self) -> Line:
+        """Our head, with its option and meta indexes built (by
+        `index_section`) the first time they're needed.
+        """
+        head = self._head
+        if head.option_index is None:
+            index_section(head)
+        return head
+
+    def _options_named(self, name: str) -> List[Option]:
+        """Our `name` options, in order."""
+        return self._index().option_index.get(name, [])
+
+    def _metas_named(self, name: str) -> List[Comment]:
+        """Our `# name = ...` meta comments, in order."""
+        return self._index().meta_index.get(name, [])
 
     def comments(self) -> Iterator[Comment]:
         return (line for line in self if isinstance(line, Comment))
@@ -230,6 +271,8 @@ class Section:
     def remove(self) -> None:
         if self.is_default:
             raise Exception("Can't remove the default section. #clear() it?")
+        if (owner := self.head.owner) is not None:
+            owner._section_removed(self.head)
         tail = last(self)
         if self.head.prev is not None:
             self.head.prev.next = tail.next
@@ -243,6 +286,9 @@ class Section:
         if replacement.is_default:
             raise ValueError("Can't replace a section with a default section")
 
+        if (owner := self.head.owner) is not None:
+            owner._section_replaced(self.head, replacement.head)
+
         if self.head.prev is None:
             replacement.head.prev = None
         else:
@@ -276,6 +322,15 @@ class Section:
         for prop_name, prop_value in props.items():
             setattr(self, prop_name, prop_value)
 
+    @classmethod
+    def check_props(cls, **props) -> None:
+        """Raise the `TypeError` `update(**props)` would, without updating
+        anything.
+        """
+        for prop_name, prop_value in props.items():
+            if isinstance(prop := getattr(cls, prop_name, None), Prop):
+                prop.check(prop_value)
+
     def __str__(self) -> str:
         return "".join((f"{line}\n" for line in self))
 
@@ -288,17 +343,17 @@ class Section:
             line = line.next
 
     def __contains__(self, name: str) -> bool:
-        return bool(find(self.options(), lambda opt: opt.name == name))
+        return bool(self._options_named(name))
 
     def __getitem__(self, name: str) -> Union[None, str, List[str]]:
+        options = self._options_named(name)
         if self.dup == "list":
-            values = [opt.value for opt in self.options() if opt.name == name]
-            if len(values) == 1:
-                return values[0]
-            elif len(values) > 1:
-                return values
-        elif option := find(self.options(), lambda opt: opt.name == name):
-            return option.value
+            if len(options) == 1:
+                return options[0].value
+            elif len(options) > 1:
+                return [opt.value for opt in options]
+        elif options:
+            return options[0].value
         return None
 
     def __setitem__(self, name: str, value: Any) -> None:
@@ -309,7 +364,7 @@ class Section:
                 self.__delitem__(name)
                 return
 
-            options = [opt for opt in self.options() if opt.name == name]
+            options = list(self._options_named(name))
 
             if len(options) == 0:
                 insert_after = last(
@@ -338,7 +393,7 @@ class Section:
                 return
 
             # pylint: disable=unexpected-keyword-arg
-            if option := find(self.options(), lambda opt: opt.name == name):
+            if option := first(self._options_named(name)):
                 if option.value == string:
                     return
                 option.value = string
@@ -353,6 +408,5 @@ class Section:
                 last_non_blank_line.insert_next(Option(name=name, value=string))
 
     def __delitem__(self, name: str) -> None:
-        for option in self.options():
-            if option.name == name:
-                option.remove()
+        for option in list(self._options_named(name)):
+            option.remove()
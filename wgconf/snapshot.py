@@ -0,0 +1,146 @@
+from __future__ import annotations
+from typing import Iterator, Optional, Tuple
+from collections import namedtuple
+from difflib import SequenceMatcher, unified_diff
+import re
+
+from .line import LazySectionHead, Line, parse_line
+from .section import Section
+
+# One section of a `Snapshot`: its `kind` (`None` for the default section),
+# first `Name` meta (if any) and body, rendered -- the head line isn't in
+# `lines`. Never changed once made, so snapshots share them freely.
+FrozenSection = namedtuple("FrozenSection", "kind name lines")
+
+_HUNK_REGEXP = re.compile(r"@@ -(\d+)((?:,\d+)?) \+(\d+)((?:,\d+)?) @@")
+
+
+class Snapshot:
+    """An immutable copy of a `File` at some point, from `File.snapshot`.
+
+    It's just a tuple of `FrozenSection`s. Sections that didn't change
+    between two snapshots of a file (or of files branched from one with
+    `File.from_snapshot`) are the very same objects in both, which is what
+    makes taking snapshots cheap and lets `diff` skip straight past them.
+    """
+
+    __slots__ = ("sections", "dup")
+
+    sections: Tuple[FrozenSection, ...]
+
+    def __init__(self, sections: Tuple[FrozenSection, ...], dup):
+        self.sections = sections
+        self.dup = dup
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(<{len(self.sections)} sections>)"
+
+    def _strings(self, sections) -> Iterator[str]:
+        for section in sections:
+            if section.kind is not None:
+                yield f"[{section.kind}]"
+            yield from section.lines
+
+    def __str__(self) -> str:
+        strings = self._strings(self.sections)
+        return "".join(f"{string}\n" for string in strings)
+
+    def diff(
+        self,
+        other: Snapshot,
+        fromfile: str = "",
+        tofile: str = "",
+        n: int = 3,
+    ) -> Iterator[str]:
+        """Lines of a unified diff from us to `other`, like
+        `difflib.unified_diff` of the two texts would give -- except that
+        sections both share are never looked at, so context stops at them.
+        """
+        ours, theirs = self.sections, other.sections
+        if ours is theirs:
+            return
+
+        matcher = SequenceMatcher(
+            None, [id(s) for s in ours], [id(s) for s in theirs], False
+        )
+        a_line = b_line = 0
+        started = False
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                a_line += _line_count(ours[i1:i2])
+                b_line += _line_count(theirs[j1:j2])
+                continue
+            a_lines = list(self._strings(ours[i1:i2]))
+            b_lines = list(self._strings(theirs[j1:j2]))
+            hunks = unified_diff(a_lines, b_lines, n=n, lineterm="")
+            for line in hunks:
+                if line.startswith(("---", "+++")):
+                    continue
+                if not started:
+                    yield f"--- {fromfile}"
+                    yield f"+++ {tofile}"
+                    started = True
+                if line.startswith("@@"):
+                    line = _offset_hunk(line, a_line, b_line)
+                yield line
+            a_line += len(a_lines)
+            b_line += len(b_lines)
+
+
+def _line_count(sections: Tuple[FrozenSection, ...]) -> int:
+    return sum(
+        len(section.lines) + (section.kind is not None)
+        for section in sections
+    )
+
+
+def _offset_hunk(header: str, a_offset: int, b_offset: int) -> str:
+    match = _HUNK_REGEXP.match(header)
+    return (
+        f"@@ -{int(match.group(1)) + a_offset}{match.group(2)} "
+        + f"+{int(match.group(3)) + b_offset}{match.group(4)} @@"
+    )
+
+
+class SnapshotSectionHead(LazySectionHead):
+    """A `LazySectionHead` whose body is a `FrozenSection`, for branching a
+    `File` off a `Snapshot`. It's parsed into lines the first time something
+    looks inside; until it changes, it's still shared with the snapshot.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, section: FrozenSection):
+        super().__init__(
+            section.kind, section, 0, len(section.lines), None, section.name
+        )
+        self.frozen = section
+
+    def _body_lines(self, body) -> Iterator[Line]:
+        # Rendered by us, so they always parse
+        return (parse_line(string) for string in body[0].lines)
+
+    def peek_strings(self) -> Optional[Iterator[str]]:
+        if self._body is None:
+            return None
+        return iter(self._body[0].lines)
+
+
+def freeze(head: Line) -> FrozenSection:
+    """`head.frozen`, making (and keeping) it first if need be."""
+    if head.frozen is None:
+        section = Section(head)
+        kind = None if section.is_default else head.value
+        if (
+            isinstance(head, LazySectionHead)
+            and (strings := head.peek_strings()) is not None
+        ):
+            names = head.peek_meta("Name") or ()
+            name = names[0] if names else None
+        else:
+            # Built indexes are what tell us about changes
+            section._index()  # pylint: disable=protected-access
+            name = section.get_meta("Name")
+            strings = (str(line) for line in section.head.body())
+        head.frozen = FrozenSection(kind, name, tuple(strings))
+    return head.frozen
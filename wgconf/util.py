@@ -1,10 +1,11 @@
 from typing import *
 from typing import TextIO # WHY?!?!
 from pathlib import Path
-from subprocess import check_output
+from subprocess import CalledProcessError, DEVNULL, PIPE, check_output
 import re
 from ipaddress import IPv4Network
 from io import IOBase
+import asyncio
 import os
 
 DEFAULT_WG_BIN_PATH = Path('/usr/bin/wg')
@@ -80,6 +81,40 @@ def genpsk(
         encoding='utf_8',
     ).strip()
 
+async def _async_wg(
+    wg_bin_path: Union[Path, str],
+    command: str,
+    input: Optional[str] = None, # pylint: disable=redefined-builtin
+) -> str:
+    cmd = [str(wg_bin_path), command]
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=(DEVNULL if input is None else PIPE),
+        stdout=PIPE,
+    )
+    stdout, _ = await process.communicate(
+        None if input is None else input.encode('utf_8')
+    )
+    if process.returncode != 0:
+        raise CalledProcessError(process.returncode, cmd, output=stdout)
+    return stdout.decode('utf_8').strip()
+
+async def async_genkey(
+    wg_bin_path: Union[Path, str] = DEFAULT_WG_BIN_PATH,
+) -> str:
+    return await _async_wg(wg_bin_path, 'genkey')
+
+async def async_pubkey(
+    private_key: str,
+    wg_bin_path: Union[Path, str] = DEFAULT_WG_BIN_PATH,
+) -> str:
+    return await _async_wg(wg_bin_path, 'pubkey', private_key)
+
+async def async_genpsk(
+    wg_bin_path: Union[Path, str] = DEFAULT_WG_BIN_PATH,
+) -> str:
+    return await _async_wg(wg_bin_path, 'genpsk')
+
 def normalize_address(address: str) -> str:
     net = IPv4Network(address)
     return f"{net.network_address}/{net.prefixlen}"
@@ -98,6 +133,37 @@ def pick(dct: Dict[K, V], keys: Container[K]) -> Dict[K, V]:
 def join_lines(lines: Iterable[str]) -> str:
     return ''.join((f"{line}\n" for line in lines))
 
+_NEWLINE_REGEXP = re.compile(rb'\n')
+
+def iter_lines(
+    source: Union[str, bytes, bytearray, memoryview],
+    start: int = 0,
+    end: Optional[int] = None,
+    encoding: str = 'utf_8',
+) -> Iterator[str]:
+    """Lines of `source[start:end]`, without their newlines, one at a time.
+
+    Only each line is ever copied out -- never the whole text (like
+    `splitlines()` or `bytes.decode()` would). Bytes-likes are decoded line by
+    line. Splits on `\n` only; a `\r` before it is left for the caller.
+    """
+    if end is None:
+        end = len(source)
+    if isinstance(source, str):
+        while start < end:
+            stop = source.find('\n', start, end)
+            if stop == -1:
+                stop = end
+            yield source[start:stop]
+            start = stop + 1
+    else:
+        view = memoryview(source).cast('B')
+        while start < end:
+            match = _NEWLINE_REGEXP.search(view, start, end)
+            stop = end if match is None else match.start()
+            yield str(view[start:stop], encoding)
+            start = stop + 1
+
 def path_property(
     name: str,
     doc: Optional[str] = None,